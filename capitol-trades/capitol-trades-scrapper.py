@@ -1,11 +1,18 @@
 import argparse
+import asyncio
 import logging
-from playwright.sync_api import sync_playwright
+import sys
+import time
+from pathlib import Path
+from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
-import pandas as pd
 from datetime import datetime
 import re
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.row_sink import RowSink  # noqa: E402
+from common.tab_pool import HostPacer, TabPool  # noqa: E402
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,  # Change to DEBUG for more detailed logs
@@ -16,6 +23,9 @@ logging.basicConfig(
     ]
 )
 
+TABS = 4  # results pages loaded at the same time
+PACING = (0.5, 1.5)  # seconds between page loads on the site, shared by all tabs
+
 def extract_total_pages(html: str) -> int:
     """Extract total number of pages from the HTML pagination info."""
     soup = BeautifulSoup(html, "html.parser")
@@ -96,60 +106,99 @@ def extract_trades_from_html(html: str):
 
     return trades_data
 
-def scrape_politician_trades(days: int = 365, total_page: int = 5):
+async def fetch_trades_page(page, url):
+    await page.goto(url)
+    await page.wait_for_selector("tbody", timeout=10000)
+    return extract_trades_from_html(await page.content())
+
+
+class PageOrderWriter:
+    """
+    Writes each page's trades to the sink as soon as every earlier page is
+    in, so pages can finish in any order but the output stays in page order.
+    """
+
+    def __init__(self, sink, next_page=1):
+        self.sink = sink
+        self.next_page = next_page
+        self._pending = {}
+
+    def add(self, page_number, trades):
+        self._pending[page_number] = trades or []
+        while self.next_page in self._pending:
+            for trade in self._pending.pop(self.next_page):
+                self.sink.write(trade)
+            self.next_page += 1
+
+
+async def scrape_politician_trades(days: int = 365, total_page: int = 5, tabs: int = TABS):
     """
     Scrapes politician trades from CapitolTrades for the given number of days,
-    starting from start_page up to last page.
+    starting from start_page up to last page. Page 1 gives the page count, the
+    rest are loaded on ``tabs`` tabs at once and streamed to a CSV in page order.
     """
     start_page = 1
     base_url = f"https://www.capitoltrades.com/trades?txDate={days}d"
     logging.info(f"Starting scraping process for {days} days, starting from page {start_page}")
+    pacer = HostPacer(*PACING)
+    started_at = time.monotonic()
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context()
+        page = await context.new_page()
 
         # First request to get total pages
         first_page_url = f"{base_url}&page=1"
         logging.info(f"Loading first page to detect total pages: {first_page_url}")
-        page.goto(first_page_url)
-        page.wait_for_selector("tbody", timeout=10000)
-        first_page_html = page.content()
+        await page.goto(first_page_url)
+        await page.wait_for_selector("tbody", timeout=10000)
+        first_page_html = await page.content()
+        await page.close()
 
         total_pages = extract_total_pages(first_page_html)
         logging.info(f"Total pages detected: {total_pages}")
         if total_page < total_pages:
             total_pages = total_page
 
-        all_trades = []
+        output_file = f"politician_trades_{days}d_page{start_page}_to_{total_pages}.csv"
+        sink = RowSink(output_file)
+        writer = PageOrderWriter(sink, next_page=start_page)
 
-        # Loop through pages from start_page to total_pages
-        for current_page in range(start_page, total_pages + 1):
+        trades = extract_trades_from_html(first_page_html)
+        logging.info(f"Extracted {len(trades)} trades from page {start_page}.")
+        writer.add(start_page, trades)
+
+        async def fetch(tab, current_page):
             url = f"{base_url}&page={current_page}"
+            await pacer.wait(url)
             logging.info(f"Scraping page {current_page} / {total_pages}: {url}")
-            if current_page != start_page:
-                page.goto(url)
-                try:
-                    page.wait_for_selector("tbody", timeout=10000)
-                except Exception as e:
-                    logging.error(f"Timeout waiting for table on page {current_page}: {e}")
-                    continue
-
-            html_content = page.content()
-            trades = extract_trades_from_html(html_content)
-            logging.info(f"Extracted {len(trades)} trades from page {current_page}.")
-            all_trades.extend(trades)
-
-        browser.close()
+            return await fetch_trades_page(tab, url)
+
+        def on_result(current_page, trades):
+            if trades is None:
+                logging.error(f"Failed to load the table on page {current_page}")
+            else:
+                logging.info(f"Extracted {len(trades)} trades from page {current_page}.")
+            writer.add(current_page, trades)
+
+        async with TabPool(context, size=tabs) as pool:
+            await pool.map(fetch, range(start_page + 1, total_pages + 1), on_result=on_result)
+
+        await browser.close()
         logging.info("Browser closed.")
 
-    if all_trades:
-        df = pd.DataFrame(all_trades)
-        output_file = f"politician_trades_{days}d_page{start_page}_to_{total_pages}.xlsx"
-        df.to_excel(output_file, index=False)
-        logging.info(f"Saved {len(all_trades)} trades to {output_file}")
+    sink.close()
+    elapsed = time.monotonic() - started_at
+    logging.info(f"{total_pages} pages in {elapsed:.1f}s with {tabs} tab(s) "
+                 f"({elapsed / max(total_pages, 1):.2f}s per page)")
+
+    if sink.count:
+        xlsx_file = output_file.replace(".csv", ".xlsx")
+        sink.export_xlsx(xlsx_file)
+        logging.info(f"Saved {sink.count} trades to {output_file} and {xlsx_file}")
     else:
-        logging.warning("No trades extracted; no file created.")
+        logging.warning("No trades extracted; the CSV is empty.")
 
 def main():
     parser = argparse.ArgumentParser(description="Fetch politician trade transaction data with pagination.")
@@ -165,9 +214,15 @@ def main():
         default=5,
         help="Total Pages to be extracted (default: 5)"
     )
+    parser.add_argument(
+        "-t", "--tabs",
+        type=int,
+        default=TABS,
+        help=f"Pages loaded concurrently (default: {TABS})"
+    )
     args = parser.parse_args()
 
-    scrape_politician_trades(days=args.days, total_page=args.page)
+    asyncio.run(scrape_politician_trades(days=args.days, total_page=args.page, tabs=args.tabs))
 
 if __name__ == "__main__":
     main()
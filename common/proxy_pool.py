@@ -0,0 +1,151 @@
+import random
+import time
+from collections import deque
+from typing import Iterable, List, Optional
+from urllib.parse import urlsplit
+
+
+class Proxy:
+    """Running health figures for one proxy URL."""
+
+    def __init__(self, url: str, window: int = 20):
+        self.url = url
+        self.requests = 0
+        self.failures = 0
+        self.latency: Optional[float] = None  # moving average of successful requests, seconds
+        self.consecutive_failures = 0
+        self.quarantined_until = 0.0
+        self.quarantines = 0
+        self.recent = deque(maxlen=window)  # True/False for the last ``window`` requests
+
+    @property
+    def success_rate(self) -> float:
+        return (self.requests - self.failures) / self.requests if self.requests else 1.0
+
+    @property
+    def recent_error_rate(self) -> float:
+        return self.recent.count(False) / len(self.recent) if self.recent else 0.0
+
+    @property
+    def score(self) -> float:
+        # Smoothed recent success rate, discounted by latency: fast, clean proxies get most of the traffic
+        ok = self.recent.count(True)
+        return (ok + 1) / (len(self.recent) + 2) / (1 + (self.latency or 0))
+
+    @property
+    def label(self) -> str:
+        """The URL without its password, for logs."""
+        parts = urlsplit(self.url)
+        if not parts.password:
+            return self.url
+        return self.url.replace(f":{parts.password}@", ":***@", 1)
+
+    def quarantined(self, now: Optional[float] = None) -> bool:
+        return self.quarantined_until > (time.monotonic() if now is None else now)
+
+    def __repr__(self) -> str:
+        return f"Proxy({self.url!r})"
+
+
+class ProxyPool:
+    """
+    Rotating proxy pool that scores every proxy on latency and error rate.
+
+    ``pick()`` chooses among the healthy proxies at random, weighted by score,
+    so traffic is spread over all of them but favours the fast ones. Callers
+    report each request with ``record(proxy, ok, latency)``. A proxy is
+    quarantined for ``quarantine_seconds`` after ``max_consecutive_failures``
+    failures in a row, when more than ``max_error_rate`` of its last
+    ``window`` requests failed, or (with ``max_latency`` set) when its latency
+    average goes over ``max_latency`` seconds after ``min_latency_samples``
+    successful requests; it comes back with a clean window and latency. When
+    every proxy is quarantined the one due back first is used.
+    """
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        max_consecutive_failures: int = 3,
+        max_error_rate: float = 0.5,
+        window: int = 20,
+        quarantine_seconds: float = 300,
+        latency_alpha: float = 0.3,
+        max_latency: Optional[float] = None,
+        min_latency_samples: int = 3,
+    ):
+        self.proxies: List[Proxy] = [Proxy(url, window) for url in dict.fromkeys(urls)]
+        if not self.proxies:
+            raise ValueError("ProxyPool needs at least one proxy URL")
+        self.max_consecutive_failures = max_consecutive_failures
+        self.max_error_rate = max_error_rate
+        self.window = window
+        self.quarantine_seconds = quarantine_seconds
+        self.latency_alpha = latency_alpha
+        self.max_latency = max_latency
+        self.min_latency_samples = min_latency_samples
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "ProxyPool":
+        """One proxy URL per line; blank lines and ``#`` comments are skipped."""
+        with open(path, encoding="utf-8") as f:
+            urls = [line.split("#", 1)[0].strip() for line in f]
+        return cls([url for url in urls if url], **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.proxies)
+
+    def healthy(self) -> List[Proxy]:
+        now = time.monotonic()
+        return [proxy for proxy in self.proxies if not proxy.quarantined(now)]
+
+    def pick(self) -> Proxy:
+        healthy = self.healthy()
+        if not healthy:
+            return min(self.proxies, key=lambda proxy: proxy.quarantined_until)
+        return random.choices(healthy, weights=[proxy.score for proxy in healthy])[0]
+
+    def record(self, proxy: Optional[Proxy], ok: bool, latency: Optional[float] = None) -> None:
+        if proxy is None:
+            return
+        proxy.requests += 1
+        proxy.recent.append(ok)
+        if ok:
+            proxy.consecutive_failures = 0
+            if latency is not None:
+                proxy.latency = latency if proxy.latency is None else (
+                    self.latency_alpha * latency + (1 - self.latency_alpha) * proxy.latency)
+                if self.too_slow(proxy):
+                    self.quarantine(proxy)
+            return
+
+        proxy.failures += 1
+        proxy.consecutive_failures += 1
+        too_many_errors = len(proxy.recent) >= self.window and proxy.recent_error_rate > self.max_error_rate
+        if proxy.consecutive_failures >= self.max_consecutive_failures or too_many_errors:
+            self.quarantine(proxy)
+
+    def too_slow(self, proxy: Proxy) -> bool:
+        return (self.max_latency is not None and proxy.latency is not None
+                and proxy.recent.count(True) >= self.min_latency_samples and proxy.latency > self.max_latency)
+
+    def quarantine(self, proxy: Proxy) -> None:
+        if self.too_slow(proxy):
+            # Otherwise the old average would put it straight back on its first request
+            proxy.latency = None
+        proxy.quarantined_until = time.monotonic() + self.quarantine_seconds
+        proxy.quarantines += 1
+        proxy.consecutive_failures = 0
+        proxy.recent.clear()
+
+    def report(self) -> str:
+        """One line per proxy: requests, success rate, latency and quarantines."""
+        now = time.monotonic()
+        lines = []
+        for proxy in sorted(self.proxies, key=lambda p: p.success_rate, reverse=True):
+            latency = f"{proxy.latency:.2f}s" if proxy.latency is not None else "-"
+            status = "quarantined" if proxy.quarantined(now) else "ok"
+            lines.append(
+                f"{proxy.label}: {proxy.requests} requests, {proxy.success_rate:.0%} ok, "
+                f"latency {latency}, quarantined {proxy.quarantines}x ({status})"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,25 @@
+import asyncio
+import time
+
+
+class RateLimiter:
+    """
+    Global cap on request starts per second, shared by every worker.
+
+    Slots are handed out ``1 / rate`` seconds apart; like HostPacer the slot
+    is reserved before sleeping, so concurrent callers queue up in order
+    instead of all waking at once.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
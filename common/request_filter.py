@@ -0,0 +1,136 @@
+import re
+import threading
+from collections import Counter
+from typing import Iterable, Optional
+
+# Defaults shared by the Playwright scrapers
+BLOCKED_EXT = (".png", ".jpg", ".jpeg", ".svg", ".gif", ".css", ".woff", ".woff2", ".ttf", ".webp")
+BLOCKED_DOMAINS = (
+    "googletagmanager", "google-analytics", "doubleclick",
+    "facebook", "twitter", "linkedin",
+    "scorecardresearch", "quantserve", "adsystem",
+    "pubmatic", "criteo", "taboola", "outbrain",
+    "adsrvr",
+)
+
+# Blocked requests never download, so bytes saved are estimated from typical
+# transfer sizes per Playwright resource type.
+ESTIMATED_BYTES = {
+    "image": 45_000,
+    "stylesheet": 30_000,
+    "font": 40_000,
+    "script": 60_000,
+    "media": 250_000,
+    "xhr": 2_000,
+    "fetch": 2_000,
+    "other": 5_000,
+}
+
+
+def _combined(patterns: Iterable[str]) -> Optional[re.Pattern]:
+    patterns = [p.lower() for p in patterns if p]
+    if not patterns:
+        return None
+    # Longest first so overlapping entries resolve the same way every time
+    return re.compile("|".join(re.escape(p) for p in sorted(set(patterns), key=len, reverse=True)))
+
+
+class BlockStats:
+    """Per-page counters filled in by a RequestFilter route handler."""
+
+    def __init__(self):
+        self.blocked = 0
+        self.allowed = 0
+        self.bytes_saved = 0
+        self.by_type: Counter = Counter()
+
+    def record(self, resource_type: str, blocked: bool) -> None:
+        if blocked:
+            self.blocked += 1
+            self.by_type[resource_type] += 1
+            self.bytes_saved += ESTIMATED_BYTES.get(resource_type, ESTIMATED_BYTES["other"])
+        else:
+            self.allowed += 1
+
+    def reset(self) -> None:
+        self.__init__()
+
+    def summary(self) -> str:
+        total = self.blocked + self.allowed
+        types = ", ".join(f"{t}={n}" for t, n in self.by_type.most_common())
+        return (
+            f"blocked {self.blocked}/{total} requests, ~{self.bytes_saved / 1024:.0f} KB avoided"
+            + (f" ({types})" if types else "")
+        )
+
+
+class RequestFilter:
+    """
+    Compiled resource-blocking rules for Playwright's page.route.
+
+    File extensions are looked up in a set (query string ignored) and domain
+    fragments are matched against the host with one combined regex. ``allow``
+    fragments win over everything else; ``deny`` adds scraper-specific
+    domains on top of ``blocked_domains``.
+    """
+
+    def __init__(
+        self,
+        blocked_ext: Iterable[str] = BLOCKED_EXT,
+        blocked_domains: Iterable[str] = BLOCKED_DOMAINS,
+        allow: Iterable[str] = (),
+        deny: Iterable[str] = (),
+    ):
+        self.suffixes = frozenset(ext.lower().lstrip(".") for ext in blocked_ext)
+        self._deny = _combined(list(blocked_domains) + list(deny))
+        self._allow = _combined(allow)
+        self.totals = BlockStats()
+        self._lock = threading.Lock()
+
+    def should_block(self, url: str) -> bool:
+        rest = url.partition("://")[2]
+        host, _, path = rest.partition("/")
+        host = host.lower()
+        if self._allow and self._allow.search(host):
+            return False
+        if self._deny and self._deny.search(host):
+            return True
+        path = path.partition("?")[0].partition("#")[0]
+        if "." not in path:
+            return False
+        return path.rpartition(".")[2].lower() in self.suffixes
+
+    __call__ = should_block
+
+    def new_stats(self) -> BlockStats:
+        return BlockStats()
+
+    def _record(self, stats: Optional[BlockStats], resource_type: str, blocked: bool) -> None:
+        if stats is not None:
+            stats.record(resource_type, blocked)
+        with self._lock:
+            self.totals.record(resource_type, blocked)
+
+    def sync_handler(self, stats: Optional[BlockStats] = None):
+        """Route handler for the sync API: page.route("**/*", f.sync_handler(stats))."""
+        def handle(route):
+            request = route.request
+            blocked = self.should_block(request.url)
+            self._record(stats, request.resource_type, blocked)
+            if blocked:
+                route.abort()
+            else:
+                route.continue_()
+        return handle
+
+    def async_handler(self, stats: Optional[BlockStats] = None):
+        """Route handler for the async API: await page.route("**/*", f.async_handler(stats))."""
+        async def handle(route):
+            request = route.request
+            blocked = self.should_block(request.url)
+            self._record(stats, request.resource_type, blocked)
+            if blocked:
+                await route.abort()
+            else:
+                await route.continue_()
+        return handle
@@ -0,0 +1,120 @@
+import csv
+import json
+import os
+import threading
+from typing import Dict, Iterator, List, Optional, Set
+
+
+class RowSink:
+    """
+    Append-only output file that rows are streamed into as they are scraped.
+
+    The format follows the extension: ``.csv`` (header taken from the first
+    row) or ``.jsonl`` (one JSON object per line). Every row is flushed
+    straight away, so an interrupted run keeps everything written so far.
+    With ``resume=True`` an existing file is appended to and the ``key``
+    values already in it end up in ``done``; without it the file is
+    started over. A last line left unfinished by a crash is cut off before
+    appending, so the next row starts on a line of its own.
+    """
+
+    def __init__(self, path: str, key: Optional[str] = None, resume: bool = False):
+        self.path = path
+        self.key = key
+        self.format = "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+        self.done: Set[str] = set()
+        self.count = 0
+        self._fieldnames: Optional[List[str]] = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+        exists = resume and os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            self._drop_torn_line()
+            for row in self.rows():
+                if self._fieldnames is None:
+                    self._fieldnames = list(row)
+                if key and row.get(key):
+                    self.done.add(str(row[key]))
+        self._file = open(path, "a" if exists else "w", encoding="utf-8", newline="")
+
+    @property
+    def fieldnames(self) -> Optional[List[str]]:
+        """The CSV header: the resumed file's, or the first written row's keys."""
+        return self._fieldnames
+
+    def _drop_torn_line(self) -> None:
+        with open(self.path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+            if not end:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b"\n":
+                return
+            # Walk back to the last complete line; a file without one is cut to nothing
+            size = end
+            while size > 0:
+                start = max(0, size - 64 * 1024)
+                f.seek(start)
+                newline = f.read(size - start).rfind(b"\n")
+                if newline >= 0:
+                    size = start + newline + 1
+                    break
+                size = start
+            f.truncate(size)
+
+    def rows(self) -> Iterator[Dict]:
+        """Reads back what has been written so far."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8", newline="") as f:
+            if self.format == "jsonl":
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # A line cut short by an interrupted run
+                        continue
+            else:
+                yield from csv.DictReader(f)
+
+    def write(self, row: Dict) -> None:
+        with self._lock:
+            if self.format == "jsonl":
+                self._file.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+            else:
+                if self._writer is None:
+                    new_file = self._fieldnames is None
+                    self._fieldnames = self._fieldnames or list(row)
+                    self._writer = csv.DictWriter(self._file, fieldnames=self._fieldnames, restval="",
+                                                  extrasaction="ignore")
+                    if new_file:
+                        self._writer.writeheader()
+                self._writer.writerow(row)
+            self._file.flush()
+            self.count += 1
+            if self.key and row.get(self.key):
+                self.done.add(str(row[self.key]))
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "RowSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def export_xlsx(self, xlsx_path: str) -> int:
+        """Builds an Excel copy from the stream; returns the number of rows exported."""
+        import pandas as pd
+
+        if not self._file.closed:
+            self._file.flush()
+        df = pd.DataFrame(list(self.rows()))
+        df.to_excel(xlsx_path, index=False)
+        return len(df)
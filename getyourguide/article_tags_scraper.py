@@ -7,7 +7,18 @@ from typing import Dict, List, Optional
 from urllib.parse import urljoin
 
 from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+
+# Optional: lxml is a much faster tree builder for the detail pages (pip install lxml)
+try:
+    import lxml  # noqa: F401
+    from bs4.element import AttributeDict
+    PARSER = "lxml"
+    # lxml hands attribute values over as strings, so the builder's per-value coercion can be skipped
+    PARSER_ARGS = {"attribute_dict_class": AttributeDict}
+except ImportError:
+    PARSER = "html.parser"
+    PARSER_ARGS = {}
 
 
 DEFAULT_URL = "https://www.getyourguide.com/london-l57/"
@@ -146,19 +157,132 @@ def text_or_none(el: Optional[object]) -> Optional[str]:
     return None
 
 
-def select_text_by_heading(soup: BeautifulSoup, heading_regex: str) -> Optional[str]:
-    pattern = re.compile(heading_regex, re.I)
-    heading = soup.find(["h2", "h3", "h4"], string=pattern)
+# Patterns used by parse_detail_html, compiled once at import time
+RATING_OUT_OF_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:/|out of)\s*5")
+RATING_NUMBER_RE = re.compile(r"\b(\d(?:\.\d+)?)\b")
+FIRST_NUMBER_RE = re.compile(r"(\d+(?:\.\d+)?)")
+RATING_CLASS_RE = re.compile("rating|stars", re.I)
+REVIEWS_RE = re.compile(r"([\d,.]+)\s+reviews", re.I)
+PROVIDER_RE = re.compile(r"(Provider|Provided by|Organized by)", re.I)
+PROVIDER_VALUE_RE = re.compile(r"(?:Provider|Provided by|Organized by)\s*:?\s*(.+)$", re.I)
+PRICE_CLASS_RE = re.compile(r"price|amount|from", re.I)
+PRICE_RE = re.compile(r"([€$£]\s*\d+[\d,\.]*|\d+[\d,\.]*\s*[€$£])")
+ABOUT_HEADING_RE = re.compile(r"^About( this activity)?$", re.I)
+ABOUT_KEY_RES = [
+    (key, re.compile(rf"{re.escape(key)}(?:\s*\(([^)]*)\))?", re.I))
+    for key in ["Free cancellation", "Duration", "Host or greeter", "Skip the line", "Small group"]
+]
+SECTION_HEADINGS = {
+    name: re.compile(rf"^{name}$", re.I)
+    for name in [
+        "Itinerary", "Highlights", "Full description", "Includes",
+        "Not suitable for", "Meeting point", "Important information",
+    ]
+}
+HEADING_TAGS = {"h2", "h3", "h4"}
+HEADING_LIKE_TAGS = {"div", "span", "p"}
+
+
+class DetailIndex:
+    """
+    One pass over a parsed detail page. Records, in document order, the
+    tags parse_detail_html looks up (ids, first tag per class, data-test-id
+    values, rating candidates, rating/price class fallbacks, h1s,
+    heading-like strings, aria-labelledby targets, the first provider
+    string) and flattens the page text once, so every lookup afterwards is
+    a dict hit or a scan of a short list instead of a walk of the tree.
+    """
+
+    def __init__(self, html: str):
+        # class stays a plain string; the index splits it only where needed
+        self.soup = BeautifulSoup(html, PARSER, multi_valued_attributes=None, **PARSER_ARGS)
+        self.ids: Dict[str, Tag] = {}
+        self.classes: Dict[str, Tag] = {}
+        self.test_ids: List[tuple] = []  # (data-test-id, tag)
+        self.rating_candidates: List[Tag] = []
+        self.h1s: List[Tag] = []
+        self.meta_description: Optional[Tag] = None
+        self.headings: List[tuple] = []  # (tag name, .string, tag)
+        self.labelled_by: Dict[str, Tag] = {}
+        self.rating_class: Optional[Tag] = None
+        self.price_class: Optional[Tag] = None
+        self.provider_string: Optional[NavigableString] = None
+        for tag in self.soup.descendants:
+            if not isinstance(tag, Tag):
+                # Comments (Vue hydration markers, mostly) are not page text
+                if self.provider_string is None and not isinstance(tag, Comment) and PROVIDER_RE.search(tag):
+                    self.provider_string = tag
+                continue
+            attrs = tag.attrs
+            name = tag.name
+            if "id" in attrs:
+                self.ids.setdefault(attrs["id"], tag)
+            if "class" in attrs:
+                class_attr = attrs["class"]
+                for cls in class_attr.split():
+                    self.classes.setdefault(cls, tag)
+                if self.rating_class is None and RATING_CLASS_RE.search(class_attr):
+                    self.rating_class = tag
+                if self.price_class is None and PRICE_CLASS_RE.search(class_attr):
+                    self.price_class = tag
+            test_id = attrs.get("data-test-id")
+            if test_id is not None:
+                self.test_ids.append((test_id, tag))
+            if (
+                "out of 5" in attrs.get("aria-label", "")
+                or (test_id is not None and "rating" in test_id)
+                or attrs.get("itemprop") == "ratingValue"
+            ):
+                self.rating_candidates.append(tag)
+            labelled = attrs.get("aria-labelledby")
+            if labelled is not None:
+                self.labelled_by.setdefault(labelled, tag)
+            if name == "h1":
+                self.h1s.append(tag)
+            elif name == "meta" and self.meta_description is None and attrs.get("name") == "description":
+                self.meta_description = tag
+            if name in HEADING_TAGS or name in HEADING_LIKE_TAGS:
+                string = tag.string
+                if string is not None and not isinstance(string, Comment):
+                    self.headings.append((name, string, tag))
+        self._text: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.soup.get_text(" ", strip=True)
+        return self._text
+
+    def first_test_id(self, match) -> Optional[Tag]:
+        for value, tag in self.test_ids:
+            if match(value):
+                return tag
+        return None
+
+    def find_heading(self, pattern: re.Pattern, names: set) -> Optional[Tag]:
+        for name, string, tag in self.headings:
+            if name in names and pattern.search(string):
+                return tag
+        return None
+
+
+def following_tags(el):
+    # Lazy equivalent of el.find_all_next(): stops as soon as the caller breaks
+    for node in el.next_elements:
+        if isinstance(node, Tag):
+            yield node
+
+
+def select_text_by_heading(index: DetailIndex, heading_regex: re.Pattern) -> Optional[str]:
+    heading = index.find_heading(heading_regex, HEADING_TAGS)
     if not heading:
         # Some headings are rendered as divs/spans with same text
-        heading = soup.find(["div", "span", "p"], string=pattern)
+        heading = index.find_heading(heading_regex, HEADING_LIKE_TAGS)
     if not heading:
         return None
     # Collect text from siblings until the next heading-like element
     texts: List[str] = []
-    for sib in heading.find_all_next():
-        if sib is heading:
-            continue
+    for sib in following_tags(heading):
         if sib.name in {"h2", "h3", "h4"}:
             break
         # gather list items or paragraphs within a bounded container
@@ -178,19 +302,52 @@ def select_text_by_heading(soup: BeautifulSoup, heading_regex: str) -> Optional[
     return "; ".join(texts) if texts else None
 
 
+def collect_section_after_heading(index: DetailIndex, heading_regex: re.Pattern) -> Optional[str]:
+    h = index.find_heading(heading_regex, {"h2", "h3"})
+    if not h:
+        return None
+    # Try to find a wrapping section/div tied to this heading via aria-labelledby
+    section = None
+    heading_id = h.get("id")
+    if heading_id:
+        section = index.labelled_by.get(heading_id)
+    texts: List[str] = []
+    if not section:
+        # Fallback: next siblings until next heading
+        for sib in following_tags(h):
+            if sib.name in {"h2", "h3"}:
+                break
+            if sib.name in {"p", "li"}:
+                t = sib.get_text(" ", strip=True)
+                if t:
+                    texts.append(t)
+        return "\n".join(texts) if texts else None
+    # If we have a section, collect paragraphs and list items within
+    for el in section.find_all(["p", "li"]):
+        t = el.get_text(" ", strip=True)
+        if t:
+            texts.append(t)
+    return "\n".join(texts) if texts else None
+
+
+def section_text(index: DetailIndex, name: str) -> Optional[str]:
+    pattern = SECTION_HEADINGS[name]
+    return collect_section_after_heading(index, pattern) or select_text_by_heading(index, pattern)
+
+
 def parse_detail_html(html: str) -> Dict[str, Optional[str]]:
-    soup = BeautifulSoup(html, "html.parser")
+    index = DetailIndex(html)
 
     # Title
     title = None
     candidates = [
-        soup.select_one("#adp-title-text"),
-        soup.select_one("h1[data-test-id='activity-title']"),
-        soup.select_one("h1.text-atom--title-1"),
-        soup.find("h1"),
+        lambda: index.ids.get("adp-title-text"),
+        lambda: next((h for h in index.h1s if h.get("data-test-id") == "activity-title"), None),
+        lambda: next((h for h in index.h1s if "text-atom--title-1" in h.get("class", "").split()), None),
+        lambda: index.h1s[0] if index.h1s else None,
     ]
     for c in candidates:
-        title = text_or_none(c)
+        title = text_or_none(c())
         if title:
             break
 
@@ -198,87 +355,87 @@ def parse_detail_html(html: str) -> Dict[str, Optional[str]]:
     rating = None
     reviews = None
     # Common patterns: aria-label like "4.7 out of 5" and sibling text like "7,800 reviews"
-    rating_text_candidates = soup.select("[aria-label*='out of 5'], [data-test-id*='rating'], [itemprop='ratingValue']")
-    for el in rating_text_candidates:
+    for el in index.rating_candidates:
         t = el.get("aria-label") or text_or_none(el)
         if not t:
             continue
-        m = re.search(r"(\d+(?:\.\d+)?)\s*(?:/|out of)\s*5", t)
+        m = RATING_OUT_OF_RE.search(t)
         if m:
             rating = m.group(1)
             break
-        m = re.search(r"\b(\d(?:\.\d+)?)\b", t)
+        m = RATING_NUMBER_RE.search(t)
         if m and float(m.group(1)) <= 5:
             rating = m.group(1)
             break
     if not rating:
         # Fallback: look for text near the first star icon container
-        star = soup.find(attrs={"class": re.compile("rating|stars", re.I)})
+        star = index.rating_class
         if star:
             t = star.get_text(" ", strip=True)
-            m = re.search(r"(\d+(?:\.\d+)?)", t)
+            m = FIRST_NUMBER_RE.search(t)
             if m:
                 rating = m.group(1)
 
-    m_reviews = re.search(r"([\d,.]+)\s+reviews", soup.get_text(" ", strip=True), re.I)
+    m_reviews = REVIEWS_RE.search(index.text)
     if m_reviews:
         reviews = f"{m_reviews.group(1)} reviews"
 
     # Provider
     provider = None
-    provider_el = soup.find(string=re.compile(r"(Provider|Provided by|Organized by)", re.I))
+    provider_el = index.provider_string
     if provider_el and provider_el.parent:
         # next significant text on the same line or following sibling
         next_text = provider_el.parent.get_text(" ", strip=True)
-        m = re.search(r"(?:Provider|Provided by|Organized by)\s*:?\s*(.+)$", next_text, re.I)
+        m = PROVIDER_VALUE_RE.search(next_text)
         if m:
             provider = m.group(1)
     if not provider:
-        prov_candidate = soup.select_one("[data-test-id='supplier-name'], [data-test-id*='supplier']")
+        prov_candidate = index.first_test_id(lambda v: "supplier" in v)
         provider = text_or_none(prov_candidate)
 
     # Price: prioritize the explicit price container if present
     price = None
     price_candidates = [
-        soup.select_one(".price-info__actual-price-explanation"),
-        soup.select_one("[data-test-id='price'], [data-test-id='activity-price']"),
-        soup.find(attrs={"class": re.compile(r"price|amount|from", re.I)}),
+        lambda: index.classes.get("price-info__actual-price-explanation"),
+        lambda: index.first_test_id(lambda v: v in ("price", "activity-price")),
+        lambda: index.price_class,
     ]
-    for pc in price_candidates:
+    for candidate in price_candidates:
+        pc = candidate()
         if not pc:
             continue
         t = pc.get_text(" ", strip=True)
-        m = re.search(r"([€$£]\s*\d+[\d,\.]*|\d+[\d,\.]*\s*[€$£])", t)
+        m = PRICE_RE.search(t)
         if m:
             price = m.group(1).replace(" ", "")
             break
     if not price:
-        m = re.search(r"([€$£]\s*\d+[\d,\.]*|\d+[\d,\.]*\s*[€$£])", soup.get_text(" ", strip=True))
+        m = PRICE_RE.search(index.text)
         if m:
             price = m.group(1).replace(" ", "")
 
     # Short Description (top blurb)
     description = None
-    desc_candidate = soup.select_one("[data-test-id='product-short-description']")
+    desc_candidate = index.first_test_id(lambda v: v == "product-short-description")
     description = text_or_none(desc_candidate)
     if not description:
         # Fallback: meta description
-        meta = soup.find("meta", attrs={"name": "description"})
+        meta = index.meta_description
         if meta and meta.get("content"):
             description = meta.get("content").strip()
 
     # Itinerary section
-    itinerary = select_text_by_heading(soup, r"^Itinerary$")
+    itinerary = select_text_by_heading(index, SECTION_HEADINGS["Itinerary"])
 
     # About: Prefer the section list under 'About' or 'About this activity'
     about = None
-    about_heading = soup.find(["h2", "h3"], string=re.compile(r"^About( this activity)?$", re.I))
+    about_heading = index.find_heading(ABOUT_HEADING_RE, {"h2", "h3"})
     if about_heading:
         # Find the nearest following list
         section_container = about_heading.find_next(lambda tag: tag.name in {"ul", "div", "section"})
         items: List[str] = []
         if section_container:
-            for li in section_container.select("li"):
+            for li in section_container.find_all("li"):
                 txt = li.get_text(" ", strip=True)
                 if txt:
                     items.append(txt)
@@ -287,8 +444,8 @@ def parse_detail_html(html: str) -> Dict[str, Optional[str]]:
     if not about:
         # Fallback to previous heuristic but keep bracketed parts intact
         about_items: List[str] = []
-        for key in ["Free cancellation", "Duration", "Host or greeter", "Skip the line", "Small group"]:
-            m = re.search(rf"{re.escape(key)}(?:\s*\(([^)]*)\))?", soup.get_text(" ", strip=True), re.I)
+        for key, pattern in ABOUT_KEY_RES:
+            m = pattern.search(index.text)
             if m:
                 if m.group(1):
                     about_items.append(f"{key} ({m.group(1)})")
@@ -297,44 +454,14 @@ def parse_detail_html(html: str) -> Dict[str, Optional[str]]:
         about = ", ".join(about_items) if about_items else None
 
     # Highlights
-    highlights_text = select_text_by_heading(soup, r"^Highlights$")
+    highlights_text = select_text_by_heading(index, SECTION_HEADINGS["Highlights"])
 
     # Full description and other sections using more robust section scoping
-    def collect_section_after_heading(heading_text_regex: str) -> Optional[str]:
-        h = soup.find(["h2", "h3"], string=re.compile(heading_text_regex, re.I))
-        if not h:
-            return None
-        # Try to find a wrapping section/div tied to this heading via aria-labelledby
-        section = None
-        heading_id = h.get("id")
-        if heading_id:
-            section = soup.find(attrs={"aria-labelledby": heading_id})
-        if not section:
-            # Fallback: next siblings until next heading
-            texts: List[str] = []
-            for sib in h.find_all_next():
-                if sib is h:
-                    continue
-                if sib.name in {"h2", "h3"}:
-                    break
-                if sib.name in {"p", "li"}:
-                    t = sib.get_text(" ", strip=True)
-                    if t:
-                        texts.append(t)
-            return "\n".join(texts) if texts else None
-        # If we have a section, collect paragraphs and list items within
-        texts: List[str] = []
-        for el in section.select("p, li"):
-            t = el.get_text(" ", strip=True)
-            if t:
-                texts.append(t)
-        return "\n".join(texts) if texts else None
-
-    full_description = collect_section_after_heading(r"^Full description$") or select_text_by_heading(soup, r"^Full description$")
-    includes = collect_section_after_heading(r"^Includes$") or select_text_by_heading(soup, r"^Includes$")
-    not_suitable = collect_section_after_heading(r"^Not suitable for$") or select_text_by_heading(soup, r"^Not suitable for$")
-    meeting_point = collect_section_after_heading(r"^Meeting point$") or select_text_by_heading(soup, r"^Meeting point$")
-    important_info = collect_section_after_heading(r"^Important information$") or select_text_by_heading(soup, r"^Important information$")
+    full_description = section_text(index, "Full description")
+    includes = section_text(index, "Includes")
+    not_suitable = section_text(index, "Not suitable for")
+    meeting_point = section_text(index, "Meeting point")
+    important_info = section_text(index, "Important information")
 
     return {
         "Title": title,
@@ -6,39 +6,50 @@ import logging
 import random
 import time
 from pathlib import Path
-from typing import Dict, List, Optional
-from urllib.parse import urljoin
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import httpx
 from playwright.sync_api import sync_playwright
 from bs4 import BeautifulSoup
 
+from browser_pool import BrowserPool
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.request_filter import RequestFilter  # noqa: E402
+
 # --- Config ---
 DEFAULT_URL = "https://www.getyourguide.com/london-l57/"
 MAX_WORKERS = 5  # adjust based on your system/network
-BLOCKED_EXT = (".png", ".jpg", ".jpeg", ".svg", ".gif", ".css", ".woff", ".woff2", ".ttf", ".webp")
-BLOCKED_DOMAINS = [
-    "googletagmanager", "google-analytics", "doubleclick",
-    "facebook", "twitter", "linkedin", "scorecardresearch",
-    "quantserve", "adsystem", "pubmatic", "criteo", "taboola",
-    "outbrain", "adsrvr"
-]
-
-def should_block(url: str) -> bool:
-    if url.lower().endswith(BLOCKED_EXT):
-        return True
-    return any(d in url.lower() for d in BLOCKED_DOMAINS)
+PAGES_PER_CONTEXT = 50  # recycle a pooled context after this many pages
+MAX_HEAP_MB = 512  # ...or once its JS heap grows past this
+HTTP_TIMEOUT = 20  # seconds, for the server-rendered fast path
+# A fast-path response only counts if parse_detail_html will find its core blocks
+REQUIRED_SELECTORS = ("#adp-title-text span", "#short-description-adp-text span", ".key-detail-item-block")
+MAX_SCROLLS = 5  # scroll steps per listing page before moving to the next one
+SCROLL_PAUSE_MS = 1000
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/127.0.0.0 Safari/537.36"
+)
+# Shared resource blocking (see common/request_filter.py)
+REQUEST_FILTER = RequestFilter()
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s",
     handlers=[logging.StreamHandler(sys.stdout)],
 )
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 def safe_text(element):
     return element.get_text(strip=True) if element else None
 
 def parse_detail_html(html: str) -> Dict[str, Optional[str]]:
-    soup = BeautifulSoup(html, "html.parser")
+    return parse_detail_soup(BeautifulSoup(html, "html.parser"))
+
+def parse_detail_soup(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
     data = {
         "title": safe_text(soup.select_one("#adp-title-text span")),
         "rating": safe_text(soup.select_one(".c-activity-rating__rating")),
@@ -105,69 +116,172 @@ def flatten_list_fields(record):
             record[k] = json.dumps(v, ensure_ascii=False)
     return record
 
-def extract_all_article_hrefs_from_listing(url: str, timeout_ms: int = 30000) -> List[str]:
-    logging.info(f"Extracting article links from listing: {url}")
+LISTING_HREFS_JS = """
+() => Array.from(document.querySelectorAll("article")).map(art => {
+    const link = art.querySelector("a[href]");
+    return link ? (link.getAttribute("href") || link.href) : null;
+}).filter(Boolean)
+"""
+
+def listing_page_url(url: str, page_number: int) -> str:
+    if page_number <= 1:
+        return url
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query["p"] = str(page_number)
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+def iter_listing_hrefs(url: str, timeout_ms: int = 30000, max_pages: int = 1, limit: int = 0) -> Iterator[str]:
+    """
+    Yield each activity URL as soon as pagination or scrolling reveals it.
+    Stops crawling (and closes the listing browser) once ``limit`` URLs are out.
+    """
+    seen = set()
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/127.0.0.0 Safari/537.36"
-            )
-        )
+        context = browser.new_context(user_agent=USER_AGENT)
         page = context.new_page()
-        page.route("**/*", lambda route, request: route.abort() if should_block(request.url) else route.continue_())
-        page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+        stats = REQUEST_FILTER.new_stats()
+        page.route("**/*", REQUEST_FILTER.sync_handler(stats))
         try:
-            page.wait_for_selector("article a[href]", timeout=15000)
-        except Exception:
-            page.wait_for_load_state("networkidle", timeout=10000)
-
-        hrefs = []
-        for art in page.query_selector_all("article"):
-            link = art.query_selector("a[href]")
-            if link:
-                href = link.get_attribute("href") or link.evaluate("el => el.href")
-                if href:
-                    absolute = href if href.startswith("http") else urljoin(url, href)
-                    hrefs.append(absolute)
-        unique = list(dict.fromkeys(hrefs))
-        browser.close()
-        logging.info(f"Found {len(unique)} unique activity links.")
-        return unique
+            for page_number in range(1, max_pages + 1):
+                page_url = listing_page_url(url, page_number)
+                logging.info(f"Extracting article links from listing page {page_number}: {page_url}")
+                page.goto(page_url, wait_until="domcontentloaded", timeout=timeout_ms)
+                try:
+                    page.wait_for_selector("article a[href]", timeout=15000)
+                except Exception:
+                    page.wait_for_load_state("networkidle", timeout=10000)
+
+                found_on_page = 0
+                for step in range(MAX_SCROLLS + 1):
+                    new = 0
+                    for href in page.evaluate(LISTING_HREFS_JS):
+                        absolute = href if href.startswith("http") else urljoin(page_url, href)
+                        if absolute not in seen:
+                            seen.add(absolute)
+                            new += 1
+                            yield absolute
+                            if limit and len(seen) >= limit:
+                                return
+                    found_on_page += new
+                    if (step and not new) or step == MAX_SCROLLS:
+                        break
+                    page.evaluate("window.scrollBy(0, document.body.scrollHeight)")
+                    page.wait_for_timeout(SCROLL_PAUSE_MS)
+
+                logging.info(f"Listing page {page_number}: {found_on_page} new links, {stats.summary()}")
+                stats.reset()
+                if not found_on_page:
+                    logging.info(f"No new activity links on listing page {page_number}, stopping pagination.")
+                    break
+        finally:
+            browser.close()
+
+def extract_all_article_hrefs_from_listing(
+    url: str, timeout_ms: int = 30000, max_pages: int = 1, limit: int = 0
+) -> List[str]:
+    unique = list(iter_listing_hrefs(url, timeout_ms=timeout_ms, max_pages=max_pages, limit=limit))
+    logging.info(f"Found {len(unique)} unique activity links.")
+    return unique
 
 def scrape_one(url: str, timeout_ms: int) -> Optional[Dict]:
     try:
         with sync_playwright() as p:
             browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                user_agent=(
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/127.0.0.0 Safari/537.36"
-                )
-            )
+            context = browser.new_context(user_agent=USER_AGENT)
             page = context.new_page()
-            page.route("**/*", lambda route, request: route.abort() if should_block(request.url) else route.continue_())
-            page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
-            try:
-                page.wait_for_load_state("networkidle", timeout=8000)
-            except Exception:
-                pass
-            html = page.content()
-            data = parse_detail_html(html)
-            data["url"] = url
+            stats = REQUEST_FILTER.new_stats()
+            page.route("**/*", REQUEST_FILTER.sync_handler(stats))
+            data = scrape_page(page, url, timeout_ms)
+            logging.debug(f"{url}: {stats.summary()}")
             browser.close()
             return data
     except Exception as e:
         logging.warning(f"Failed to scrape {url}: {e}")
         return None
 
+def scrape_page(page, url: str, timeout_ms: int) -> Dict:
+    page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+    try:
+        page.wait_for_load_state("networkidle", timeout=8000)
+    except Exception:
+        pass
+    data = parse_detail_html(page.content())
+    data["url"] = url
+    return data
+
+def new_http_client(pool_size: int) -> httpx.Client:
+    return httpx.Client(
+        headers={"User-Agent": USER_AGENT, "Accept-Language": "en-US,en;q=0.9"},
+        follow_redirects=True,
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+    )
+
+def fetch_detail_http(client: httpx.Client, url: str) -> Optional[Dict]:
+    """Fetch a detail page without a browser; None if it isn't fully server-rendered."""
+    response = client.get(url)
+    if response.status_code != 200:
+        logging.debug(f"HTTP {response.status_code} for {url}, falling back to browser")
+        return None
+    soup = BeautifulSoup(response.text, "html.parser")
+    missing = [sel for sel in REQUIRED_SELECTORS if not soup.select_one(sel)]
+    if missing:
+        logging.debug(f"{url} is missing {missing}, falling back to browser")
+        return None
+    data = parse_detail_soup(soup)
+    data["url"] = url
+    return data
+
+def log_throughput(mode: str, pages: int, started: float) -> None:
+    elapsed = time.monotonic() - started
+    rate = pages / elapsed * 60 if elapsed > 0 else 0.0
+    logging.info(f"⏱️ {mode}: {pages} pages in {elapsed:.1f}s ({rate:.1f} pages/min)")
+
+def scrape_details_pooled(
+    detail_urls: Iterable[str], timeout_ms: int = 30000, queue_size: int = 0, http_first: bool = True
+) -> List[Dict]:
+    """
+    Feed URLs into the browser pool. ``detail_urls`` may be a lazy iterator:
+    with a bounded ``queue_size`` the producer only runs ahead of the detail
+    workers by that many URLs. With ``http_first`` each page is tried over a
+    shared HTTP client and only rendered in Chromium if that comes back
+    incomplete.
+    """
+    logging.info(f"Scraping detail pages with a pool of {MAX_WORKERS} browsers...")
+    client = new_http_client(MAX_WORKERS) if http_first else None
+    pool = BrowserPool(
+        handler=lambda page, url: scrape_page(page, url, timeout_ms),
+        size=MAX_WORKERS,
+        user_agent=USER_AGENT,
+        request_filter=REQUEST_FILTER,
+        max_pages_per_context=PAGES_PER_CONTEXT,
+        max_heap_mb=MAX_HEAP_MB,
+        queue_size=queue_size,
+        prefetch=(lambda url: fetch_detail_http(client, url)) if client else None,
+    )
+    try:
+        with pool:
+            for url in detail_urls:
+                pool.put(url)
+    finally:
+        if client:
+            client.close()
+    if client:
+        logging.info(f"⚡ HTTP fast path: {pool.pages_fast_path}/{pool.pages_done} pages, rest rendered in Chromium")
+    logging.info(f"🚫 Request filter totals: {REQUEST_FILTER.totals.summary()}")
+    logging.info(
+        f"⏱️ pool: {pool.pages_done} pages ({pool.pages_failed} failed) at {pool.pages_per_minute:.1f} pages/min, "
+        f"{pool.contexts_recycled} contexts recycled"
+    )
+    return pool.results
+
 def scrape_details(detail_urls: List[str], timeout_ms: int = 30000) -> List[Dict]:
     results = []
     total = len(detail_urls)
-    logging.info(f"Scraping {total} detail pages with {MAX_WORKERS} workers...")
+    started = time.monotonic()
+    logging.info(f"Scraping {total} detail pages with {MAX_WORKERS} workers (browser per URL)...")
 
     with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
         futures = {executor.submit(scrape_one, url, timeout_ms): url for url in detail_urls}
@@ -180,32 +294,56 @@ def scrape_details(detail_urls: List[str], timeout_ms: int = 30000) -> List[Dict
                     logging.info(f"[{i}/{total}] Done: {url}")
             except Exception as e:
                 logging.warning(f"[{i}/{total}] Error scraping {url}: {e}")
+    log_throughput("per-URL launch", len(results), started)
     return results
 
 def main() -> None:
-    global MAX_WORKERS
+    global MAX_WORKERS, PAGES_PER_CONTEXT, MAX_HEAP_MB
     parser = argparse.ArgumentParser(description="Scrape GetYourGuide activities into CSV and JSON (fast mode).")
     parser.add_argument("--url", default=DEFAULT_URL, help="Listing page URL")
     parser.add_argument("--timeout-ms", type=int, default=30000, help="Timeout per page")
     parser.add_argument("--limit", type=int, default=10, help="Max number of detail pages to scrape")
     parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Concurrent worker count")
+    parser.add_argument("--pages-per-context", type=int, default=PAGES_PER_CONTEXT, help="Recycle a pooled context after N pages")
+    parser.add_argument("--max-heap-mb", type=int, default=MAX_HEAP_MB, help="Recycle a pooled context above this JS heap size")
+    parser.add_argument("--no-pool", action="store_true", help="Launch a fresh browser per URL (old behaviour, for comparison)")
+    parser.add_argument("--no-http", action="store_true", help="Always render detail pages in Chromium (skip the HTTP fast path)")
+    parser.add_argument("--max-pages", type=int, default=1, help="Max number of listing result pages to walk")
+    parser.add_argument("--stream", action="store_true", help="Scrape detail pages while the listing is still being crawled")
     args = parser.parse_args()
+    if args.stream and args.no_pool:
+        parser.error("--stream needs the browser pool; drop --no-pool")
 
     MAX_WORKERS = args.workers
+    PAGES_PER_CONTEXT = args.pages_per_context
+    MAX_HEAP_MB = args.max_heap_mb
 
     csv_file = Path("activities.csv")
     json_file = Path("activities.json")
 
+    started = time.monotonic()
     try:
-        detail_urls = extract_all_article_hrefs_from_listing(args.url, timeout_ms=args.timeout_ms)
-        if not detail_urls:
-            logging.error("No activity links found.")
-            sys.exit(1)
-
-        if args.limit > 0:
-            detail_urls = detail_urls[:args.limit]
+        if args.stream:
+            # Producer/consumer: listing pagination pushes URLs straight into the pool
+            detail_urls = iter_listing_hrefs(
+                args.url, timeout_ms=args.timeout_ms, max_pages=args.max_pages, limit=max(args.limit, 0)
+            )
+            results = scrape_details_pooled(
+                detail_urls, timeout_ms=args.timeout_ms, queue_size=MAX_WORKERS * 2, http_first=not args.no_http
+            )
+        else:
+            detail_urls = extract_all_article_hrefs_from_listing(
+                args.url, timeout_ms=args.timeout_ms, max_pages=args.max_pages, limit=max(args.limit, 0)
+            )
+            if not detail_urls:
+                logging.error("No activity links found.")
+                sys.exit(1)
 
-        results = scrape_details(detail_urls, timeout_ms=args.timeout_ms)
+            if args.no_pool:
+                results = scrape_details(detail_urls, timeout_ms=args.timeout_ms)
+            else:
+                results = scrape_details_pooled(detail_urls, timeout_ms=args.timeout_ms, http_first=not args.no_http)
+        log_throughput("total run", len(results), started)
         if results:
             with open(json_file, "w", encoding="utf-8") as jf:
                 json.dump(results, jf, ensure_ascii=False, indent=2)
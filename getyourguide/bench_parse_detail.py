@@ -0,0 +1,99 @@
+"""
+Benchmark for article_tags_scraper.parse_detail_html.
+
+Runs the indexed parser and the previous implementation (read from git at
+--baseline, the commit before the index) over saved detail-page HTML,
+checks that both return identical records and reports the best time per
+page. Exits non-zero on a mismatch or when a page is less than
+--min-speedup times faster.
+
+    python bench_parse_detail.py [page.html ...] [--runs N] [--min-speedup X] [--baseline REV]
+"""
+import argparse
+import importlib.util
+import subprocess
+import sys
+import time
+import types
+from pathlib import Path
+from typing import Callable, List
+
+HERE = Path(__file__).resolve().parent
+BASELINE = "f44f1ae"  # last commit with the tree-walking parser
+
+_spec = importlib.util.spec_from_file_location("article_tags_scraper", HERE / "article_tags_scraper.py")
+article_tags_scraper = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(article_tags_scraper)
+
+
+def load_baseline(rev: str) -> Callable:
+    """parse_detail_html as it was at ``rev``."""
+    source = subprocess.run(
+        ["git", "show", f"{rev}:./article_tags_scraper.py"], cwd=HERE, capture_output=True, text=True, check=True,
+    ).stdout
+    module = types.ModuleType(f"article_tags_scraper_{rev}")
+    exec(compile(source, f"{rev}:article_tags_scraper.py", "exec"), module.__dict__)
+    return module.parse_detail_html
+
+
+def time_per_page(parsers, html: str, runs: int, min_seconds: float = 1.0) -> List[float]:
+    """
+    Best time of ``runs`` for each parser (more runs for small pages, until
+    the first parser has had ``min_seconds``). The parsers take turns within
+    every run, so a noisy machine slows them down alike instead of skewing
+    the ratio.
+    """
+    best = [float("inf")] * len(parsers)
+    spent = 0.0
+    run = 0
+    while run < runs or spent < min_seconds:
+        run += 1
+        for i, parse in enumerate(parsers):
+            started = time.perf_counter()
+            parse(html)
+            elapsed = time.perf_counter() - started
+            best[i] = min(best[i], elapsed)
+            if i == 0:
+                spent += elapsed
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark parse_detail_html against the previous implementation.")
+    parser.add_argument("files", nargs="*", default=[str(path) for path in sorted(HERE.glob("sample_article*.html"))],
+                        help="Saved detail-page HTML files (default: every sample_article*.html)")
+    parser.add_argument("--runs", type=int, default=20,
+                        help="Minimum parses per file and implementation (default: 20)")
+    parser.add_argument("--min-speedup", type=float, default=3.0, help="Fail below this speedup per page (default: 3)")
+    parser.add_argument("--baseline", default=BASELINE,
+                        help=f"Git revision of the parser to compare against (default: {BASELINE})")
+    args = parser.parse_args()
+    try:
+        legacy_parse_detail_html = load_baseline(args.baseline)
+    except (OSError, subprocess.CalledProcessError) as e:
+        detail = (getattr(e, "stderr", None) or str(e)).strip()
+        parser.error(f"could not read the baseline parser from git at {args.baseline}: {detail}")
+
+    mismatches = 0
+    too_slow = 0
+    total_old = total_new = 0.0
+    for path in args.files:
+        html = Path(path).read_text(encoding="utf-8")
+        if legacy_parse_detail_html(html) != article_tags_scraper.parse_detail_html(html):
+            mismatches += 1
+            print(f"MISMATCH: {path}", file=sys.stderr)
+        old, new = time_per_page([legacy_parse_detail_html, article_tags_scraper.parse_detail_html], html, args.runs)
+        total_old += old
+        total_new += new
+        print(f"{Path(path).name}: legacy {old * 1000:.1f} ms/page, indexed {new * 1000:.1f} ms/page ({old / new:.2f}x)")
+        if old / new < args.min_speedup:
+            too_slow += 1
+            print(f"TOO SLOW: {path} is under {args.min_speedup}x", file=sys.stderr)
+
+    print(f"Overall: {total_old / total_new:.2f}x faster over {len(args.files)} page(s), {mismatches} mismatch(es), "
+          f"{too_slow} page(s) under {args.min_speedup}x")
+    sys.exit(1 if mismatches or too_slow else 0)
+
+
+if __name__ == "__main__":
+    main()
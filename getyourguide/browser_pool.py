@@ -0,0 +1,198 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from playwright.sync_api import sync_playwright
+
+# Sentinel pushed once per worker to shut the pool down
+_STOP = object()
+
+HEAP_JS = "() => (performance.memory ? performance.memory.usedJSHeapSize : 0)"
+
+
+class BrowserPool:
+    """
+    Long-lived pool of Chromium workers for detail pages.
+
+    Playwright's sync API is bound to the thread that started it, so every
+    worker thread owns one browser for the whole run. For each URL the worker
+    leases its warm context/page, runs ``handler(page, url)`` and hands the
+    lease back. Requests go through ``request_filter`` (a common
+    RequestFilter) and its blocked/bytes-saved counts are logged per page.
+    The context is recycled after ``max_pages_per_context`` pages or once the
+    page's JS heap passes ``max_heap_mb``.
+
+    If ``prefetch(url)`` is given it is tried first; when it returns a record
+    the browser is skipped for that URL. Browsers are only launched once a
+    worker actually needs one. A URL whose browser or context can't be set up
+    counts as failed and the worker starts over with a fresh browser; after
+    ``max_setup_failures`` of those in a row it only drains the queue, so
+    ``put()`` and ``close()`` never block on a dead pool.
+    """
+
+    def __init__(
+        self,
+        handler: Callable,
+        size: int = 5,
+        user_agent: Optional[str] = None,
+        request_filter=None,
+        max_pages_per_context: int = 50,
+        max_heap_mb: int = 512,
+        queue_size: int = 0,
+        prefetch: Optional[Callable[[str], Optional[Dict]]] = None,
+        max_setup_failures: int = 3,
+    ):
+        self.handler = handler
+        self.prefetch = prefetch
+        self.size = size
+        self.user_agent = user_agent
+        self.request_filter = request_filter
+        self.max_pages_per_context = max_pages_per_context
+        self.max_heap_bytes = max_heap_mb * 1024 * 1024
+        self.max_setup_failures = max_setup_failures
+        self.results: List[Dict] = []
+        self.pages_done = 0
+        self.pages_failed = 0
+        self.pages_fast_path = 0
+        self.contexts_recycled = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    def start(self) -> "BrowserPool":
+        self._started_at = time.monotonic()
+        for i in range(self.size):
+            t = threading.Thread(target=self._worker, name=f"browser-{i + 1}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        logging.info(f"Started browser pool with {self.size} browsers.")
+        return self
+
+    def put(self, url: str) -> None:
+        """Queue a URL for scraping; blocks while a bounded queue is full."""
+        self._queue.put(url)
+
+    def close(self) -> List[Dict]:
+        """Wait for queued URLs to finish, shut the browsers down and return results."""
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for t in self._threads:
+            t.join()
+        self._finished_at = time.monotonic()
+        return self.results
+
+    def __enter__(self) -> "BrowserPool":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    @property
+    def pages_per_minute(self) -> float:
+        if self._started_at is None:
+            return 0.0
+        elapsed = (self._finished_at or time.monotonic()) - self._started_at
+        return self.pages_done / elapsed * 60 if elapsed > 0 else 0.0
+
+    def _new_lease(self, browser):
+        context = browser.new_context(user_agent=self.user_agent) if self.user_agent else browser.new_context()
+        page = context.new_page()
+        stats = None
+        if self.request_filter:
+            stats = self.request_filter.new_stats()
+            page.route("**/*", self.request_filter.sync_handler(stats))
+        return context, page, stats
+
+    def _should_recycle(self, page, served: int) -> bool:
+        if served >= self.max_pages_per_context:
+            return True
+        try:
+            return page.evaluate(HEAP_JS) > self.max_heap_bytes
+        except Exception:
+            # A page we can't query is not worth keeping
+            return True
+
+    def _record(self, url: str, result: Optional[Dict], fast_path: bool = False, stats=None) -> None:
+        with self._lock:
+            if result:
+                self.results.append(result)
+                self.pages_done += 1
+                if fast_path:
+                    self.pages_fast_path += 1
+                detail = " (http)" if fast_path else (f" ({stats.summary()})" if stats else "")
+                logging.info(f"[{self.pages_done}] Done: {url}{detail}")
+            else:
+                self.pages_failed += 1
+
+    @staticmethod
+    def _close_quietly(close: Callable) -> None:
+        try:
+            close()
+        except Exception as e:
+            logging.debug(f"Error while closing: {e}")
+
+    def _teardown(self, playwright, browser, context) -> None:
+        if context is not None:
+            self._close_quietly(context.close)
+        if browser is not None:
+            self._close_quietly(browser.close)
+        if playwright is not None:
+            self._close_quietly(playwright.stop)
+
+    def _worker(self) -> None:
+        playwright, browser, context, page, stats, served = None, None, None, None, None, 0
+        setup_failures = 0
+        try:
+            while True:
+                url = self._queue.get()
+                if url is _STOP:
+                    break
+                if self.prefetch:
+                    try:
+                        result = self.prefetch(url)
+                    except Exception as e:
+                        logging.debug(f"Fast path failed for {url}: {e}")
+                        result = None
+                    if result:
+                        self._record(url, result, fast_path=True)
+                        continue
+                if setup_failures >= self.max_setup_failures:
+                    # No browser to be had in this worker: keep draining so producers never block on put()
+                    self._record(url, None)
+                    continue
+                try:
+                    if browser is None:
+                        playwright = sync_playwright().start()
+                        browser = playwright.chromium.launch(headless=True)
+                    if context is None:
+                        context, page, stats = self._new_lease(browser)
+                        served = 0
+                    elif stats:
+                        stats.reset()
+                except Exception as e:
+                    setup_failures += 1
+                    logging.warning(f"Browser setup failed for {url} ({setup_failures}/{self.max_setup_failures}): {e}")
+                    self._record(url, None)
+                    # Start over with a fresh browser for the next URL
+                    self._teardown(playwright, browser, context)
+                    playwright, browser, context, page = None, None, None, None
+                    continue
+                setup_failures = 0
+                try:
+                    result = self.handler(page, url)
+                except Exception as e:
+                    logging.warning(f"Failed to scrape {url}: {e}")
+                    result = None
+                served += 1
+                self._record(url, result, stats=stats)
+                if result is None or self._should_recycle(page, served):
+                    self._close_quietly(context.close)
+                    context, page = None, None
+                    with self._lock:
+                        self.contexts_recycled += 1
+        finally:
+            self._teardown(playwright, browser, context)
@@ -1,10 +1,23 @@
 import asyncio
+import csv
+import os
 import pandas as pd
 import random
 import logging
+import sys
+import time
+from pathlib import Path
+
+import httpx
 from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.proxy_pool import ProxyPool  # noqa: E402
+from common.rate_limit import RateLimiter  # noqa: E402
+from common.row_sink import RowSink  # noqa: E402
+from common.tab_pool import ContextPool  # noqa: E402
+
 # Configure Logging
 logging.basicConfig(
     level=logging.INFO,
@@ -14,16 +27,96 @@ logging.basicConfig(
         logging.StreamHandler()
     ]
 )
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
-async def scrape_parcel(parcel_number, page):
-    cleaned_parcel_number = parcel_number.replace("-", "")
-    url = f"https://lancasterpa.devnetwedge.com/parcel/view/{cleaned_parcel_number}/2025"
-    logging.info(f"Scraping: {url}")
+PARCEL_URL = "https://lancasterpa.devnetwedge.com/parcel/view/{}/{}"
+DEFAULT_YEAR = 2025
 
-    await page.goto(url, wait_until="networkidle", timeout=60000)
-    content = await page.content()
-    soup = BeautifulSoup(content, 'html.parser')
+OUTPUT_FILE = "lancaster_parcel_data.csv"  # one row appended per result as parcels finish
+SEARCH_KEY = "Searched Parcel Number"  # the input parcel number, used by --resume
+YEAR_KEY = "Page Year"  # the tax year whose parcel page the row came from
+PROGRESS_EVERY = 100
+
+# The parcel page is server-rendered: fetch it over HTTP and only open it in
+# Chromium when the response has no overview panel (challenge, error page...)
+HTTP_CONCURRENCY = 10
+MAX_REQUESTS_PER_SECOND = 5  # global cap across all HTTP workers
+HTTP_TIMEOUT = 30
+BROWSER_CONCURRENCY = 5
+BROWSER_PAGE_MAX_USES = 25  # parcels per browser context before it is rebuilt
+BLOCKED_STATUSES = (403, 407, 429)  # (and 5xx) count against the proxy that got them
+MAX_PROXY_LATENCY = 15  # seconds (moving average, browser loads included) before a --proxy-file proxy is quarantined
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+
+def parcel_url(parcel_number, year=DEFAULT_YEAR):
+    return PARCEL_URL.format(parcel_number.replace("-", ""), year)
+
+
+def parse_years(value):
+    """'2016-2025', '2023,2025' or '2025' -> sorted list of years."""
+    years = set()
+    for part in value.split(","):
+        start, _, end = part.strip().partition("-")
+        years.update(range(int(start), int(end or start) + 1))
+    return sorted(years)
+
+
+class ParcelCache:
+    """
+    Parcel ID, owner and address parsed from the first page of a parcel and
+    reused for its other years. ``expect`` registers how many pages a parcel
+    has scheduled and ``release`` drops its entry once the last one is done,
+    so the cache only holds parcels that are in flight.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self._entries = {}
+        self._remaining = {}
+
+    def expect(self, parcel_number, pages):
+        self._remaining[parcel_number] = self._remaining.get(parcel_number, 0) + pages
+
+    def get(self, parcel_number):
+        entry = self._entries.get(parcel_number)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def put(self, parcel_number, entry):
+        self._entries.setdefault(parcel_number, entry)
+
+    def release(self, parcel_number):
+        self._remaining[parcel_number] = self._remaining.get(parcel_number, 1) - 1
+        if self._remaining[parcel_number] <= 0:
+            self._remaining.pop(parcel_number, None)
+            self._entries.pop(parcel_number, None)
+
+
+def error_rows(parcel_number):
+    return [{
+        "Parcel Number": parcel_number,
+        "Tax Year": 'N/A',
+        "Delinquent Tax Amount": 'N/A',
+        "Owner Name": 'N/A',
+        "Property Address": 'N/A'
+    }]
+
+
+def is_failed(row):
+    return row.get("Delinquent Tax Amount") == 'N/A'
+
+
+def has_overview(soup):
+    return soup.find('div', id='overview-body') is not None
 
+
+def parse_owner(soup):
+    """(parcel ID, owner name, property address) from the overview and owner panels."""
     # Extract Parcel ID
     parcel_id_div = soup.find('div', class_='panel-body', id='overview-body')
     property_id = ''
@@ -51,6 +144,17 @@ async def scrape_parcel(parcel_number, page):
                     address_lines.append(value_div.text.strip())
 
     property_address = ', '.join(address_lines)
+    return property_id, owner_name, property_address
+
+
+def parse_parcel(parcel_number, soup, cache=None):
+    """Rows from the overview, owner and Delinquent Taxes panels of a parcel page."""
+    owner = cache.get(parcel_number) if cache is not None else None
+    if owner is None:
+        owner = parse_owner(soup)
+        if cache is not None and owner[0]:
+            cache.put(parcel_number, owner)
+    property_id, owner_name, property_address = owner
 
     # Check for Delinquent Taxes
     delinquent_rows = []
@@ -71,8 +175,9 @@ async def scrape_parcel(parcel_number, page):
                         "Owner Name": owner_name,
                         "Property Address": property_address
                     })
-    else:
-        # No Delinquent Taxes found
+
+    if not delinquent_rows:
+        # No Delinquent Taxes panel, or one without year rows (e.g. a single "None" cell)
         delinquent_rows.append({
             "Parcel Number": property_id or parcel_number,
             "Tax Year": 'N/A',
@@ -81,72 +186,283 @@ async def scrape_parcel(parcel_number, page):
             "Property Address": property_address
         })
 
-    logging.info(f"Scraping completed for parcel {parcel_number}")
     return delinquent_rows
 
-async def process_batch(batch, browser, concurrency=5):
-    sem = asyncio.Semaphore(concurrency)
-    results = []
 
-    async def scrape_with_limit(parcel_number):
-        async with sem:
-            page = await browser.new_page()
+async def scrape_parcel(parcel_number, page, year=DEFAULT_YEAR, cache=None):
+    url = parcel_url(parcel_number, year)
+    logging.info(f"Scraping in browser: {url}")
+
+    await page.goto(url, wait_until="networkidle", timeout=60000)
+    content = await page.content()
+    soup = BeautifulSoup(content, 'html.parser')
+    if not has_overview(soup):
+        # Blocked or not rendered: an error row, and a failure for the page's proxy
+        raise RuntimeError(f"No parcel overview on {url}")
+    rows = parse_parcel(parcel_number, soup, cache)
+    logging.info(f"Scraping completed for parcel {parcel_number} ({year})")
+    return rows
+
+
+def new_http_client(proxy_url=None):
+    return httpx.AsyncClient(
+        headers={"User-Agent": USER_AGENT, "Accept-Language": "en-US,en;q=0.9"},
+        follow_redirects=True,
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(max_connections=HTTP_CONCURRENCY, max_keepalive_connections=HTTP_CONCURRENCY),
+        proxy=proxy_url,
+    )
+
+
+class ProxiedClients:
+    """
+    One pooled httpx client per proxy; every request goes out through the
+    proxy the ProxyPool picks and its outcome is recorded against it.
+    Without a pool there is a single direct client.
+    """
+
+    def __init__(self, proxies=None):
+        self.proxies = proxies
+        self._clients = {}
+
+    def pick(self):
+        proxy = self.proxies.pick() if self.proxies else None
+        url = proxy.url if proxy else None
+        if url not in self._clients:
+            self._clients[url] = new_http_client(url)
+        return proxy, self._clients[url]
+
+    def record(self, proxy, ok, latency=None):
+        if self.proxies:
+            self.proxies.record(proxy, ok, latency)
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+
+
+async def fetch_parcel_http(parcel_number, clients, limiter, year=DEFAULT_YEAR, cache=None):
+    """Parses the raw parcel page, or returns None when it has to go through the browser."""
+    await limiter.wait()
+    proxy, client = clients.pick()
+    started_at = time.monotonic()
+    try:
+        response = await client.get(parcel_url(parcel_number, year))
+    except httpx.HTTPError:
+        clients.record(proxy, False)
+        raise
+    blocked = response.status_code in BLOCKED_STATUSES or response.status_code >= 500
+    clients.record(proxy, not blocked, time.monotonic() - started_at)
+    if response.status_code != 200:
+        logging.debug(f"HTTP {response.status_code} for parcel {parcel_number} ({year})")
+        return None
+    soup = BeautifulSoup(response.text, 'html.parser')
+    if not has_overview(soup):
+        return None
+    logging.info(f"Scraping completed for parcel {parcel_number} ({year}, http)")
+    return parse_parcel(parcel_number, soup, cache)
+
+
+class BrowserFallback:
+    """
+    Chromium for the parcels HTTP couldn't resolve, launched the first time one
+    needs it. Pages are leased from a ContextPool, so each context takes its
+    own proxy from the ProxyPool.
+    """
+
+    def __init__(self, playwright, browser_args, proxies=None, concurrency=BROWSER_CONCURRENCY):
+        self.playwright = playwright
+        self.browser_args = browser_args
+        self.proxies = proxies
+        self.concurrency = concurrency
+        self.browser = None
+        self.pool = None
+        self.used = 0
+        self._lock = asyncio.Lock()
+
+    async def scrape(self, parcel_number, year=DEFAULT_YEAR, cache=None):
+        async with self._lock:
+            if self.browser is None:
+                logging.info("Parcel page incomplete over HTTP, starting the browser fallback")
+                self.browser = await self.playwright.chromium.launch(**self.browser_args)
+                self.pool = await ContextPool(self.browser, size=self.concurrency, max_uses=BROWSER_PAGE_MAX_USES,
+                                              proxies=self.proxies).start()
+        self.used += 1
+        try:
+            async with self.pool.page() as page:
+                return await scrape_parcel(parcel_number, page, year, cache)
+        finally:
+            await asyncio.sleep(random.uniform(1, 3))
+
+    async def close(self):
+        if self.browser is not None:
+            await self.pool.close()
+            await self.browser.close()
+
+
+async def scrape_one(parcel_number, clients, limiter, fallback, use_http=True, year=DEFAULT_YEAR, cache=None):
+    try:
+        result = None
+        if use_http:
             try:
-                result = await scrape_parcel(parcel_number, page)
-            except Exception as e:
-                logging.error(f"Error scraping {parcel_number}: {e}")
-                result = [{
-                    "Parcel Number": parcel_number,
-                    "Tax Year": 'N/A',
-                    "Delinquent Tax Amount": 'N/A',
-                    "Owner Name": 'N/A',
-                    "Property Address": 'N/A'
-                }]
-            finally:
-                await page.close()
-                await asyncio.sleep(random.uniform(1, 3))
-            return result
+                result = await fetch_parcel_http(parcel_number, clients, limiter, year, cache)
+            except httpx.HTTPError as e:
+                logging.debug(f"HTTP fetch failed for {parcel_number} ({year}): {e}")
+        if result is None:
+            result = await fallback.scrape(parcel_number, year, cache)
+    except Exception as e:
+        logging.error(f"Error scraping {parcel_number} ({year}): {e}")
+        result = error_rows(parcel_number)
+    return [{SEARCH_KEY: parcel_number, YEAR_KEY: str(year), **row} for row in result]
+
+
+async def run_workers(jobs, scrape, sink, concurrency):
+    """
+    ``concurrency`` workers pull (parcel, year) jobs from one shared iterator,
+    so only that many pages are ever in flight, and stream their rows to ``sink``.
+    """
+    pending = iter(jobs)
+    counts = {"pages": 0, "failed": 0}
+    started_at = time.monotonic()
+
+    async def worker():
+        for job in pending:
+            rows = await scrape(job)
+            for row in rows:
+                sink.write(row)
+            counts["pages"] += 1
+            counts["failed"] += bool(rows) and is_failed(rows[0])
+            if counts["pages"] % PROGRESS_EVERY == 0:
+                rate = counts["pages"] / max(time.monotonic() - started_at, 1e-6) * 60
+                logging.info(f"{counts['pages']} parcel pages done ({rate:.0f}/min), {sink.count} rows written")
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return counts
 
-    tasks = [scrape_with_limit(pn) for pn in batch]
-    all_results = await asyncio.gather(*tasks)
-    for result in all_results:
-        results.extend(result)
-    return results
 
-async def main(parcel_numbers, proxy_url=None):
-    batch_size = 5000  # adjust as needed
-    all_data = []
+def read_parcel_numbers(path):
+    with open(path) as f:
+        for line in f:
+            parcel_number = line.strip()
+            if parcel_number:
+                yield parcel_number
+
+
+def schedule(parcel_numbers, years, cache, done=()):
+    """Every (parcel, year) page still to scrape, all years of a parcel back to back."""
+    for parcel_number in parcel_numbers:
+        pending = [year for year in years if (parcel_number, str(year)) not in done]
+        if pending:
+            cache.expect(parcel_number, len(pending))
+        for year in pending:
+            yield parcel_number, year
+
+
+def completed_pages(sink):
+    """(parcel, year) pages with at least one good row; pages that only failed are retried."""
+    return {
+        (row[SEARCH_KEY], row.get(YEAR_KEY) or str(DEFAULT_YEAR))
+        for row in sink.rows() if row.get(SEARCH_KEY) and not is_failed(row)
+    }
+
+
+def add_year_column(sink):
+    """
+    A CSV written before --years has no Page Year column, and the sink would
+    drop it from every appended row. Rewrites the file with the column (its
+    rows came from DEFAULT_YEAR pages); returns True if it did.
+    """
+    fieldnames = sink.fieldnames
+    if sink.format != "csv" or not fieldnames or YEAR_KEY in fieldnames:
+        return False
+    rows = list(sink.rows())
+    sink.close()
+    at = fieldnames.index(SEARCH_KEY) + 1 if SEARCH_KEY in fieldnames else 0
+    fieldnames = fieldnames[:at] + [YEAR_KEY] + fieldnames[at:]
+    tmp_file = sink.path + ".tmp"
+    with open(tmp_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**row, YEAR_KEY: str(DEFAULT_YEAR)})
+    os.replace(tmp_file, sink.path)
+    return True
+
+
+def export_xlsx(output_file, xlsx_file):
+    """
+    Excel copy of the CSV ordered by parcel and page year, without the error
+    rows of pages a later run resolved.
+    """
+    df = pd.read_csv(output_file, dtype=str, keep_default_na=False)
+    if YEAR_KEY not in df:
+        df[YEAR_KEY] = str(DEFAULT_YEAR)
+    failed = df["Delinquent Tax Amount"] == "N/A"
+    page = df[SEARCH_KEY] + "/" + df[YEAR_KEY]
+    resolved = set(page[~failed])
+    df = df[~(failed & page.isin(resolved))]
+    df = df.sort_values([SEARCH_KEY, YEAR_KEY], kind="stable")
+    df.to_excel(xlsx_file, index=False)
+    return len(df)
+
+
+async def main(parcel_numbers, proxy_url=None, use_http=True, output_file=OUTPUT_FILE, xlsx_file=None,
+               resume=False, concurrency=None, years=(DEFAULT_YEAR,), proxy_file=None):
+    limiter = RateLimiter(MAX_REQUESTS_PER_SECOND)
+    concurrency = concurrency or (HTTP_CONCURRENCY if use_http else BROWSER_CONCURRENCY)
+    cache = ParcelCache()
+    sink = RowSink(output_file, resume=resume)
+    done = set()
+    if resume and add_year_column(sink):
+        logging.info(f"Added a '{YEAR_KEY}' column ({DEFAULT_YEAR}) to the rows already in '{output_file}'.")
+        sink = RowSink(output_file, resume=True)
+    if resume:
+        done = completed_pages(sink)
+        logging.info(f"Resuming: {len(done)} parcel pages already in '{output_file}'.")
+    logging.info(f"Tax years: {', '.join(map(str, years))}")
+    jobs = schedule(parcel_numbers, years, cache, done)
+
+    proxies = None
+    if proxy_file:
+        proxies = ProxyPool.from_file(proxy_file, max_latency=MAX_PROXY_LATENCY)
+        logging.info(f"Loaded {len(proxies)} proxies from '{proxy_file}'.")
+    elif proxy_url:
+        proxies = ProxyPool([proxy_url])
+        logging.info(f"Using proxy: {proxy_url}")
+    else:
+        logging.info("No proxy configured. Proceeding without proxy.")
+    clients = ProxiedClients(proxies)
 
     async with async_playwright() as p:
         browser_args = {
             "headless": True
         }
-        if proxy_url:
-            browser_args["proxy"] = {"server": proxy_url}
-            logging.info(f"Using proxy: {proxy_url}")
-        else:
-            logging.info("No proxy configured. Proceeding without proxy.")
-
-        browser = await p.chromium.launch(**browser_args)
-
-        for i in range(0, len(parcel_numbers), batch_size):
-            batch = parcel_numbers[i:i+batch_size]
-            batch_number = i // batch_size + 1
-            total_batches = (len(parcel_numbers) - 1) // batch_size + 1
-            logging.info(f"Processing batch {batch_number} of {total_batches} (parcels {i+1} to {i+len(batch)})")
-            batch_results = await process_batch(batch, browser)
-            all_data.extend(batch_results)
-            # Save intermediate results
-            df = pd.DataFrame(all_data)
-            df.to_excel(f"lancaster_parcel_data_batch_{batch_number}.xlsx", index=False)
-            logging.info(f"Batch {batch_number} saved with {len(batch_results)} rows.")
-            await asyncio.sleep(random.uniform(10, 20))  # polite delay between batches
-
-        await browser.close()
-    logging.info("All batches processed and saved.")
+        fallback = BrowserFallback(p, browser_args, proxies)
+
+        async def scrape(job):
+            parcel_number, year = job
+            try:
+                return await scrape_one(parcel_number, clients, limiter, fallback, use_http=use_http,
+                                        year=year, cache=cache)
+            finally:
+                cache.release(parcel_number)
+
+        counts = await run_workers(jobs, scrape, sink, concurrency)
+
+        await fallback.close()
+    await clients.aclose()
+    sink.close()
+    logging.info(f"{counts['pages']} parcel pages scraped ({counts['failed']} failed), "
+                 f"{fallback.used} needed the browser, {cache.hits} reused cached owner details.")
+    logging.info(f"{sink.count} rows saved to '{output_file}'.")
+    if proxies:
+        logging.info("Proxy health:\n" + proxies.report())
+
+    if xlsx_file:
+        exported = export_xlsx(output_file, xlsx_file)
+        logging.info(f"Exported {exported} rows to '{xlsx_file}'.")
 
 if __name__ == "__main__":
-    import sys
     import argparse
 
     parser = argparse.ArgumentParser(description="Lancaster Parcel Scraper")
@@ -156,18 +472,57 @@ if __name__ == "__main__":
         default=None,
         help="Optional proxy URL, e.g., http://143.198.42.182:31280"
     )
+    parser.add_argument(
+        "--proxy-file",
+        type=str,
+        default=None,
+        help="File with one proxy URL per line; requests rotate over the healthiest ones (overrides --proxy)"
+    )
     parser.add_argument(
         "--input-file",
         type=str,
         default="parcel_numbers.txt",
         help="Path to the input file with parcel numbers"
     )
+    parser.add_argument(
+        "--browser-only",
+        action="store_true",
+        help="Load every parcel page in Chromium instead of fetching it over HTTP first"
+    )
+    parser.add_argument(
+        "--output",
+        default=OUTPUT_FILE,
+        help="CSV (or .jsonl) file rows are appended to as parcels finish"
+    )
+    parser.add_argument(
+        "--xlsx",
+        default=None,
+        help="Optional Excel export of the output at the end, e.g. lancaster_parcel_data.xlsx"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Append to --output and skip parcel pages already scraped (failed pages are retried)"
+    )
+    parser.add_argument(
+        "--years",
+        type=parse_years,
+        default=[DEFAULT_YEAR],
+        help=f"Tax years to scrape for every parcel, e.g. 2016-2025 or 2023,2025 (default: {DEFAULT_YEAR})"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help=f"Parcels in flight (default: {HTTP_CONCURRENCY} over HTTP, {BROWSER_CONCURRENCY} with --browser-only)"
+    )
     args = parser.parse_args()
 
     try:
-        with open(args.input_file) as f:
-            parcel_numbers = [line.strip() for line in f if line.strip()]
-        logging.info(f"Loaded {len(parcel_numbers)} parcel numbers from file '{args.input_file}'.")
-        asyncio.run(main(parcel_numbers, proxy_url=args.proxy))
+        logging.info(f"Reading parcel numbers from file '{args.input_file}'.")
+        asyncio.run(main(read_parcel_numbers(args.input_file), proxy_url=args.proxy,
+                         use_http=not args.browser_only, output_file=args.output, xlsx_file=args.xlsx,
+                         resume=args.resume, concurrency=args.concurrency, years=args.years,
+                         proxy_file=args.proxy_file))
     except Exception as e:
         logging.exception(f"Script terminated with an error: {e}")
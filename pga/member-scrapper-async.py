@@ -4,9 +4,14 @@ import csv
 import json
 import re
 import logging
+import sys
+from pathlib import Path
 from bs4 import BeautifulSoup
 from playwright.async_api import async_playwright
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.request_filter import BLOCKED_EXT, RequestFilter  # noqa: E402
+
 # --- Logging Setup ---
 logging.basicConfig(
     level=logging.INFO,
@@ -18,21 +23,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# --- Blocked URLs ---
-BLOCKED_EXT = (".png", ".jpg", ".jpeg", ".gif", ".css", ".woff", ".woff2", ".ttf", ".webp")
-BLOCKED_DOMAINS = [
-    "googletagmanager", "google-analytics", "doubleclick",
-    "facebook", "twitter", "linkedin",
-    "scorecardresearch", "quantserve", "adsystem",
-    "pubmatic", "criteo", "taboola", "outbrain",
-    "adsrvr", "doubleclick"
-]
-
-
-def should_block(url: str) -> bool:
-    if url.lower().endswith(BLOCKED_EXT):
-        return True
-    return any(d in url.lower() for d in BLOCKED_DOMAINS)
+# --- Blocked URLs (see common/request_filter.py); SVGs are kept for the directory UI ---
+REQUEST_FILTER = RequestFilter(blocked_ext=[ext for ext in BLOCKED_EXT if ext != ".svg"])
 
 
 async def scrape_member_detail(context, link, retries=3):
@@ -61,10 +53,8 @@ async def scrape_member_detail(context, link, retries=3):
         try:
             logger.info(f"🔍 Scraping member {member_id} (Attempt {attempt}/{retries})")
             detail_page = await context.new_page()
-
-            await detail_page.route("**/*", lambda route: asyncio.create_task(
-                route.abort() if should_block(route.request.url) else route.continue_()
-            ))
+            stats = REQUEST_FILTER.new_stats()
+            await detail_page.route("**/*", REQUEST_FILTER.async_handler(stats))
 
             async def handle_response(response):
                 try:
@@ -118,7 +108,7 @@ async def scrape_member_detail(context, link, retries=3):
             await detail_page.goto(link, timeout=60000, wait_until="load")
             await asyncio.sleep(random.uniform(1.0, 2.0))
             await detail_page.close()
-            logger.info(f"✅ Finished scraping member {member_id}")
+            logger.info(f"✅ Finished scraping member {member_id} ({stats.summary()})")
             return member_detail
 
         except Exception as e:
@@ -169,11 +159,10 @@ async def start_scraping(max_pages=3):
             url = f"https://directory.pga.org/?refinementList%5BprogramHistory.programCode%5D=&refinementList%5Bmember_type_label%5D%5B0%5D=MB&refinementList%5Bfacility_type_label%5D=&page={page_num}&configure%5BhitsPerPage%5D=6&configure%5Bfacets%5D%5B0%5D=_geoloc&configure%5Bfacets%5D%5B1%5D=zip&query="
             logger.info(f"📄 Scraping directory page {page_num} -> {url}")
             page = await context.new_page()
-
-            await page.route("**/*", lambda route: asyncio.create_task(
-                route.abort() if should_block(route.request.url) else route.continue_()
-            ))
+            stats = REQUEST_FILTER.new_stats()
+            await page.route("**/*", REQUEST_FILTER.async_handler(stats))
             await page.goto(url, timeout=60000, wait_until="load")
+            logger.info(f"🚫 Directory page {page_num}: {stats.summary()}")
 
             links = await get_member_links(page)
             await page.close()
@@ -193,6 +182,7 @@ async def start_scraping(max_pages=3):
             all_data.extend(results)
 
         await write_data_to_csv(all_data)
+        logger.info(f"🚫 Request filter totals: {REQUEST_FILTER.totals.summary()}")
         await browser.close()
         logger.info("🏁 Scraping complete!")
 
@@ -6,20 +6,14 @@ import csv
 import time
 import json
 import re
+import sys
+from pathlib import Path
 
-BLOCKED_EXT = (".png", ".jpg", ".jpeg", ".gif", ".css", ".woff", ".woff2", ".ttf",".webp")
-BLOCKED_DOMAINS = [
-    "googletagmanager", "google-analytics", "doubleclick",
-    "facebook", "twitter", "linkedin",
-    "scorecardresearch", "quantserve", "adsystem",
-    "pubmatic", "criteo", "taboola", "outbrain",
-    "adsrvr","doubleclick"
-]
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.request_filter import BLOCKED_EXT, RequestFilter  # noqa: E402
 
-def should_block(url: str) -> bool:
-    if url.lower().endswith(BLOCKED_EXT):
-        return True
-    return any(d in url.lower() for d in BLOCKED_DOMAINS)
+# Shared resource blocking (see common/request_filter.py); SVGs are kept for the directory UI
+REQUEST_FILTER = RequestFilter(blocked_ext=[ext for ext in BLOCKED_EXT if ext != ".svg"])
 
 def scrape_member_detail(context, link, retries=3):
     member_id_match = re.search(r'/member/detail/(\d+)', link)
@@ -61,12 +55,11 @@ def scrape_member_detail(context, link, retries=3):
             context.on("response", handle_response)
 
             detail_page = context.new_page()
-            detail_page.route("**/*",
-                              lambda route: route.abort()
-                              if should_block(route.request.url)
-                              else route.continue_())
+            stats = REQUEST_FILTER.new_stats()
+            detail_page.route("**/*", REQUEST_FILTER.sync_handler(stats))
             detail_page.goto(link, timeout=60000, wait_until="load")
             detail_page.close()
+            print(f"  {stats.summary()}")
 
             return member_detail
 
@@ -101,13 +94,11 @@ def start_scraping(context, max_pages=5):
         url = f"https://directory.pga.org/?refinementList%5BprogramHistory.programCode%5D=&refinementList%5Bmember_type_label%5D%5B0%5D=MB&refinementList%5Bfacility_type_label%5D=&page={page_number}&configure%5BhitsPerPage%5D=6&configure%5Bfacets%5D%5B0%5D=_geoloc&configure%5Bfacets%5D%5B1%5D=zip&query="
         page = context.new_page()
         print(f"Navigating to page {page_number}...")
-        page.route(
-            "**/*",
-            lambda route: route.abort()
-            if should_block(route.request.url)
-            else route.continue_())
+        stats = REQUEST_FILTER.new_stats()
+        page.route("**/*", REQUEST_FILTER.sync_handler(stats))
 
         page.goto(url, wait_until="load", timeout=60000)
+        print(f"Directory page {page_number}: {stats.summary()}")
 
         member_links = get_member_links(page)
         print(f"Found {len(member_links)} member detail links on page {page_number}.")
@@ -122,6 +113,7 @@ def start_scraping(context, max_pages=5):
         page.close()
 
     write_data_to_csv(all_member_data)
+    print(f"Request filter totals: {REQUEST_FILTER.totals.summary()}")
 
 def main():
     with sync_playwright() as p:
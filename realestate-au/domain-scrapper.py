@@ -1,12 +1,20 @@
+import argparse
 import asyncio
 from patchright.async_api import async_playwright
 from bs4 import BeautifulSoup
 import csv
 
+from portal_crawl import HostPacer, crawl_portal
+from property_index import MERGED_FILE, PropertyIndex
+
+DETAIL_TABS = 4  # concurrent detail tabs for this portal
+MAX_LISTINGS = 60  # stop once this many listings were found
+MAX_PAGES = 50  # safety net; crawling also stops at the first page without new listings
+PACING = (0.5, 1.5)  # seconds between requests to the same host
+
 SEARCH_URL = "https://www.domain.com.au/sale/gold-coast-qld/?page={}"
 
-async def extract_listing_details(browser, listing_url):
-    page = await browser.new_page()
+async def extract_listing_details(page, listing_url):
     try:
         await page.goto(listing_url, timeout=60000)
         await page.wait_for_selector("body")
@@ -29,29 +37,27 @@ async def extract_listing_details(browser, listing_url):
     except Exception as e:
         print(f"Error extracting {listing_url}: {e}")
         return None
-    finally:
-        await page.close()
 
-async def scrape_results(page, browser, page_number):
-    url = SEARCH_URL.format(page_number)
+async def collect_listing_cards(page, url):
     print(f"Scraping search page: {url}")
     await page.goto(url)
     await page.wait_for_selector("article", timeout=20000)
 
     soup = BeautifulSoup(await page.content(), "html.parser")
-    listings = []
-
-    cards = soup.select("article a[href*='/property-']")
-    listing_links = list({f"https://www.domain.com.au{a['href']}" for a in cards if a.get('href')})
-
-    for link in listing_links:
-        details = await extract_listing_details(browser, link)
-        if details:
-            listings.append(details)
-
-    return listings
-
-async def main():
+    cards = []
+    for article in soup.select("article"):
+        link = article.select_one("a[href*='/property-']")
+        if not link or not link.get('href'):
+            continue
+        address = article.select_one("[data-testid='address-wrapper'], h2[data-testid*='address']")
+        cards.append({
+            "url": f"https://www.domain.com.au{link['href']}",
+            "address": address.get_text(" ", strip=True) if address else "",
+        })
+    return cards
+
+async def main(tabs=DETAIL_TABS, max_listings=MAX_LISTINGS, max_pages=MAX_PAGES, dedupe=True):
+    index = PropertyIndex() if dedupe else None
     async with async_playwright() as p:
         browser = await p.chromium.launch_persistent_context(
             user_data_dir="...",
@@ -60,12 +66,12 @@ async def main():
             no_viewport=True )
         # browser = await p.chromium.launch(headless=True)
         # context = await browser.new_context()
-        page = await browser.new_page()
 
-        all_listings = []
-        for page_number in range(1, 4):  # Scrape first 3 pages
-            listings = await scrape_results(page, browser, page_number)
-            all_listings.extend(listings)
+        all_listings = await crawl_portal(
+            browser, SEARCH_URL, collect_listing_cards, extract_listing_details,
+            tabs=tabs, max_listings=max_listings, max_pages=max_pages, pacer=HostPacer(*PACING),
+            index=index, portal="domain",
+        )
 
         await browser.close()
 
@@ -77,5 +83,17 @@ async def main():
 
         print(f"Scraped {len(all_listings)} listings.")
 
+    if index is not None:
+        merged = index.export_merged()
+        index.close()
+        print(f"Merged index: {merged} properties across both portals in '{MERGED_FILE}'.")
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Scrape Domain listings for the Gold Coast.")
+    parser.add_argument("--tabs", type=int, default=DETAIL_TABS, help="Concurrent detail tabs (1 = one at a time)")
+    parser.add_argument("--max-listings", type=int, default=MAX_LISTINGS, help="Stop after this many listings")
+    parser.add_argument("--max-pages", type=int, default=MAX_PAGES, help="Upper bound on results pages")
+    parser.add_argument("--no-dedupe", action="store_true", help="Fetch every detail page, ignore the shared index")
+    args = parser.parse_args()
+    asyncio.run(main(tabs=args.tabs, max_listings=args.max_listings, max_pages=args.max_pages,
+                     dedupe=not args.no_dedupe))
@@ -0,0 +1,98 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.tab_pool import HostPacer, TabPool  # noqa: E402
+
+
+async def crawl_portal(
+    context,
+    search_url: str,
+    collect_cards: Callable[[object, str], Awaitable[List[Dict]]],
+    extract: Callable[[object, str], Awaitable[Optional[Dict]]],
+    tabs: int = 4,
+    max_listings: int = 60,
+    max_pages: int = 50,
+    pacer: Optional[HostPacer] = None,
+    index=None,
+    portal: str = "",
+) -> List[Dict]:
+    """
+    Walks ``search_url.format(page_number)`` until ``max_listings`` listings
+    have been found, a results page brings no new links, or ``max_pages`` is
+    hit. ``collect_cards`` returns one dict per results card with at least
+    ``url`` (and ``address`` when the card shows it). Each page's cards go to
+    a TabPool of ``tabs`` detail tabs straight away, so the next results page
+    loads while the details are being fetched.
+
+    With a PropertyIndex, cards the other portal already scraped reuse its
+    fields instead of fetching the detail page.
+    """
+    results_page = await context.new_page()
+    seen = set()
+    batches = []
+    reused = []
+    fetch_times = []
+    started_at = time.monotonic()
+
+    async def fetch(page, card):
+        link = card["url"]
+        if pacer:
+            await pacer.wait(link)
+        fetch_started = time.monotonic()
+        details = await extract(page, link)
+        fetch_times.append(time.monotonic() - fetch_started)
+        if details and index is not None:
+            index.add(portal, card, details)
+        return details
+
+    async with TabPool(context, size=tabs) as pool:
+        for page_number in range(1, max_pages + 1):
+            url = search_url.format(page_number)
+            if pacer:
+                await pacer.wait(url)
+            try:
+                cards = await collect_cards(results_page, url)
+            except Exception as e:
+                print(f"Error loading search page {url}: {e}")
+                break
+
+            new_cards = list({card["url"]: card for card in cards if card["url"] not in seen}.values())
+            new_cards = new_cards[:max_listings - len(seen)]
+            if not new_cards:
+                print(f"No new listings on page {page_number}, stopping.")
+                break
+            seen.update(card["url"] for card in new_cards)
+            print(f"Page {page_number}: {len(new_cards)} new listings ({len(seen)}/{max_listings})")
+
+            to_fetch = []
+            for card in new_cards:
+                record = index.match(portal, card) if index is not None else None
+                if record:
+                    reused.append(record)
+                else:
+                    to_fetch.append(card)
+            batches.append(asyncio.create_task(pool.map(fetch, to_fetch)))
+
+            if len(seen) >= max_listings:
+                break
+
+        listings = [details for batch in await asyncio.gather(*batches) for details in batch if details]
+
+    listings.extend(reused)
+
+    await results_page.close()
+    if index is not None:
+        print(index.summary())
+
+    elapsed = time.monotonic() - started_at
+    if fetch_times:
+        print(
+            f"⏱️ {len(listings)} listings ({len(fetch_times)} fetched) in {elapsed:.1f}s with {tabs} tab(s): "
+            f"{elapsed / max(len(listings), 1):.2f}s per listing overall, "
+            f"{sum(fetch_times) / len(fetch_times):.2f}s per detail page"
+        )
+    return listings
@@ -0,0 +1,132 @@
+import csv
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+# Shared by domain-scrapper.py and realestate-scrapper.py
+INDEX_PATH = str(Path(__file__).resolve().parent / "property_index.db")
+MERGED_FILE = "goldcoast_properties.csv"
+
+PORTALS = ("domain", "realestate")
+FIELDS = ["title", "address", "agent_name", "agent_email"]
+
+STREET_TYPES = {
+    "street": "st", "road": "rd", "avenue": "ave", "av": "ave", "drive": "dr", "court": "ct",
+    "parade": "pde", "place": "pl", "crescent": "cres", "cr": "cres", "terrace": "tce", "highway": "hwy",
+    "boulevard": "blvd", "boulevarde": "blvd", "lane": "ln", "close": "cl", "esplanade": "esp",
+    "circuit": "cct", "grove": "gr", "way": "wy", "square": "sq",
+}
+STATES = {"queensland": "qld", "new south wales": "nsw"}
+UNIT_PREFIX = re.compile(r"^(?:unit|apartment|apt|villa|townhouse|lot)\s+(\w+)[\s,]+(\d+\w?)\b")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS properties (
+    address_key TEXT PRIMARY KEY,
+    title TEXT,
+    address TEXT,
+    agent_name TEXT,
+    agent_email TEXT,
+    domain_url TEXT,
+    realestate_url TEXT,
+    updated TEXT
+);
+CREATE INDEX IF NOT EXISTS properties_agent_email ON properties (agent_email);
+"""
+
+
+def normalize_address(address: Optional[str]) -> str:
+    """'Unit 3, 12 Smith Street, Burleigh Heads QLD 4220' -> '3/12 smith st burleigh heads qld 4220'"""
+    text = (address or "").lower().strip()
+    for name, abbr in STATES.items():
+        text = text.replace(name, abbr)
+    text = UNIT_PREFIX.sub(r"\1/\2", text)
+    text = re.sub(r"\s*/\s*", "/", text)
+    tokens = re.sub(r"[^\w/]+", " ", text).split()
+    return " ".join(STREET_TYPES.get(token, token) for token in tokens)
+
+
+class PropertyIndex:
+    """
+    Local SQLite index of properties seen on either portal, keyed by
+    normalised address. A scraper looks a results card up before fetching
+    its detail page; when the other portal already has the property the
+    stored fields are reused. Results cards carry no agent email, so the
+    match is on address alone; when a fetched detail page shows a different
+    agent email for a stored address, the newer listing replaces the old one.
+    """
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self.reused = 0
+        self.fetched = 0
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    def _row(self, address_key: str) -> Optional[sqlite3.Row]:
+        if not address_key:
+            return None
+        return self.conn.execute("SELECT * FROM properties WHERE address_key = ?", (address_key,)).fetchone()
+
+    def match(self, portal: str, card: Dict) -> Optional[Dict]:
+        """
+        Returns a record for ``card`` built from the other portal's fields, or
+        None if the detail page has to be fetched.
+        """
+        row = self._row(normalize_address(card.get("address")))
+        if row is None or not any(row[f"{other}_url"] for other in PORTALS if other != portal):
+            return None
+        self.conn.execute(f"UPDATE properties SET {portal}_url = ?, updated = ? WHERE address_key = ?",
+                          (card["url"], datetime.now().isoformat(timespec="seconds"), row["address_key"]))
+        self.conn.commit()
+        self.reused += 1
+        return {field: row[field] or "" for field in FIELDS}
+
+    def add(self, portal: str, card: Dict, details: Dict) -> None:
+        """Stores a freshly fetched detail record under its card (or detail) address."""
+        self.fetched += 1
+        address_key = normalize_address(card.get("address") or details.get("address"))
+        if not address_key:
+            return
+        email = (details.get("agent_email") or "").lower()
+        row = self._row(address_key)
+        if row is not None and email and row["agent_email"] and email != row["agent_email"]:
+            # Same address, different listing agent: the newest listing replaces the old one
+            self.conn.execute("DELETE FROM properties WHERE address_key = ?", (address_key,))
+            row = None
+        values = {field: details.get(field) or "" for field in FIELDS}
+        values["agent_email"] = email
+        if row is not None:
+            # Fill gaps only; the first portal to see a field keeps it
+            values = {field: row[field] or values[field] for field in FIELDS}
+        self.conn.execute(
+            f"""INSERT INTO properties (address_key, title, address, agent_name, agent_email, {portal}_url, updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(address_key) DO UPDATE SET
+                    title = excluded.title, address = excluded.address, agent_name = excluded.agent_name,
+                    agent_email = excluded.agent_email, {portal}_url = excluded.{portal}_url,
+                    updated = excluded.updated""",
+            (address_key, values["title"], values["address"], values["agent_name"], values["agent_email"],
+             card["url"], datetime.now().isoformat(timespec="seconds")),
+        )
+        self.conn.commit()
+
+    def export_merged(self, path: str = MERGED_FILE) -> int:
+        """One row per property with the listing URL from each portal."""
+        columns = FIELDS + [f"{portal}_url" for portal in PORTALS]
+        rows = self.conn.execute(f"SELECT {', '.join(columns)} FROM properties ORDER BY address_key").fetchall()
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(tuple(row) for row in rows)
+        return len(rows)
+
+    def summary(self) -> str:
+        total = self.reused + self.fetched
+        saved = self.reused / total * 100 if total else 0
+        return f"{self.reused} of {total} detail fetches reused from the other portal ({saved:.0f}% saved)"
@@ -1,12 +1,20 @@
+import argparse
 import asyncio
 from patchright.async_api import async_playwright
 from bs4 import BeautifulSoup
 import csv
 
+from portal_crawl import HostPacer, crawl_portal
+from property_index import MERGED_FILE, PropertyIndex
+
+DETAIL_TABS = 2  # concurrent detail tabs for this portal
+MAX_LISTINGS = 60  # stop once this many listings were found
+MAX_PAGES = 50  # safety net; crawling also stops at the first page without new listings
+PACING = (0.5, 1.5)  # seconds between requests to the same host
+
 SEARCH_URL = "https://www.realestate.com.au/buy/list-{}?locations=gold-coast%2C%2Cnorthern-nsw"
 
-async def extract_listing_details(context, listing_url):
-    page = await context.new_page()
+async def extract_listing_details(page, listing_url):
     try:
         await page.goto(listing_url, timeout=60000)
         await page.wait_for_selector("body")
@@ -28,38 +36,36 @@ async def extract_listing_details(context, listing_url):
     except Exception as e:
         print(f"Error extracting {listing_url}: {e}")
         return None
-    finally:
-        await page.close()
 
-async def scrape_results(page, context, page_number):
-    url = SEARCH_URL.format(page_number)
+async def collect_listing_cards(page, url):
     print(f"Scraping search page: {url}")
     await page.goto(url)
     await page.wait_for_selector("article")
 
     soup = BeautifulSoup(await page.content(), "html.parser")
-    listings = []
-
-    cards = soup.select("article a.details-link, article a.residential-card__details-link")
-    listing_links = list({f"https://www.realestate.com.au{a['href']}" for a in cards if a.get('href')})
-
-    for link in listing_links:
-        details = await extract_listing_details(context, link)
-        if details:
-            listings.append(details)
-
-    return listings
-
-async def main():
+    cards = []
+    for article in soup.select("article"):
+        link = article.select_one("a.details-link, a.residential-card__details-link")
+        if not link or not link.get('href'):
+            continue
+        address = article.select_one(".residential-card__address-heading, h2[class*='address']")
+        cards.append({
+            "url": f"https://www.realestate.com.au{link['href']}",
+            "address": address.get_text(" ", strip=True) if address else "",
+        })
+    return cards
+
+async def main(tabs=DETAIL_TABS, max_listings=MAX_LISTINGS, max_pages=MAX_PAGES, dedupe=True):
+    index = PropertyIndex() if dedupe else None
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=False)
         context = await browser.new_context()
-        page = await context.new_page()
 
-        all_listings = []
-        for page_number in range(1, 4):  # Scrape first 3 pages
-            listings = await scrape_results(page, context, page_number)
-            all_listings.extend(listings)
+        all_listings = await crawl_portal(
+            context, SEARCH_URL, collect_listing_cards, extract_listing_details,
+            tabs=tabs, max_listings=max_listings, max_pages=max_pages, pacer=HostPacer(*PACING),
+            index=index, portal="realestate",
+        )
 
         await browser.close()
 
@@ -71,5 +77,17 @@ async def main():
 
         print(f"Scraped {len(all_listings)} listings.")
 
+    if index is not None:
+        merged = index.export_merged()
+        index.close()
+        print(f"Merged index: {merged} properties across both portals in '{MERGED_FILE}'.")
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Scrape realestate.com.au listings for the Gold Coast.")
+    parser.add_argument("--tabs", type=int, default=DETAIL_TABS, help="Concurrent detail tabs (1 = one at a time)")
+    parser.add_argument("--max-listings", type=int, default=MAX_LISTINGS, help="Stop after this many listings")
+    parser.add_argument("--max-pages", type=int, default=MAX_PAGES, help="Upper bound on results pages")
+    parser.add_argument("--no-dedupe", action="store_true", help="Fetch every detail page, ignore the shared index")
+    args = parser.parse_args()
+    asyncio.run(main(tabs=args.tabs, max_listings=args.max_listings, max_pages=args.max_pages,
+                     dedupe=not args.no_dedupe))
@@ -0,0 +1,244 @@
+import json
+import re
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Output columns filled from structured data, in the order they are written
+FIELDS = [
+    "Agent Names",
+    "Agency Name",
+    "Primary Image URL",
+    "Property Address",
+    "Sales Method",
+    "Property Type",
+    "Bedrooms",
+    "Bathrooms",
+    "Parking Space",
+    "Floor Area",
+    "Land Area",
+    "Listing Date",
+    "Capital Value",
+]
+
+# Returns only the JSON-LD blocks and the embedded app-state scripts, so the
+# page is never serialised as a whole when the structured data is enough.
+STRUCTURED_DATA_JS = """
+() => {
+    const texts = (selector) => [...document.querySelectorAll(selector)].map((s) => s.textContent).filter(Boolean);
+    return {
+        ld: texts('script[type="application/ld+json"]'),
+        json: texts('script[type="fastboot/shoebox"], script#__NEXT_DATA__, script[type="application/json"]'),
+    };
+}
+"""
+
+# Key names the listing object uses in the embedded app state (JSON:API dasherised and camelCase)
+STATE_KEYS = {
+    "Property Address": ("display-address", "displayAddress", "full-address", "fullAddress"),
+    "Sales Method": ("price-display", "priceDisplay", "pricing-method", "pricingMethod"),
+    "Property Type": ("listing-sub-type", "listingSubType", "property-type", "propertyType"),
+    "Bedrooms": ("bedroom-count", "bedroomCount", "bedrooms"),
+    "Bathrooms": ("bathroom-count", "bathroomCount", "bathrooms"),
+    "Parking Space": ("parking-garage-count", "garageCount", "garages", "parking"),
+    "Floor Area": ("floor-area", "floorArea"),
+    "Land Area": ("land-area", "landArea"),
+    "Listing Date": ("published-date", "publishedDate", "listed-date", "listedDate"),
+    "Capital Value": ("capital-value", "capitalValue", "rateable-value", "rateableValue"),
+    "Primary Image URL": ("primary-image-url", "primaryImageUrl", "cover-image-url", "coverImageUrl"),
+    "Agency Name": ("office-name", "officeName", "agency-name", "agencyName"),
+    "Agent Names": ("agents", "listing-agents", "listingAgents"),
+}
+
+LISTING_LD_TYPES = {
+    "RealEstateListing", "Residence", "SingleFamilyResidence", "House", "Apartment", "Accommodation", "Product",
+    "Place",
+}
+AGENT_LD_TYPES = {"Person", "RealEstateAgent"}
+AGENCY_LD_TYPES = {"RealEstateAgent", "Organization", "LocalBusiness"}
+
+
+def merge_names(names: List[str]) -> str:
+    """'A', 'A & B', 'A, B & C'"""
+    names = [n for n in names if n]
+    if len(names) > 1:
+        return ", ".join(names[:-1]) + " & " + names[-1]
+    return names[0] if names else ""
+
+
+def _loads(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def _walk(data) -> Iterable[Dict]:
+    # Breadth-first, so nodes come out in document order
+    queue = deque([data])
+    while queue:
+        node = queue.popleft()
+        if isinstance(node, dict):
+            yield node
+            queue.extend(node.values())
+        elif isinstance(node, list):
+            queue.extend(node)
+        elif isinstance(node, str) and node[:1] in "{[":
+            # shoebox / Apollo caches keep nested documents as strings
+            queue.append(_loads(node))
+
+
+def _types(node: Dict) -> set:
+    t = node.get("@type")
+    return set(t) if isinstance(t, list) else {t}
+
+
+def _text(value) -> str:
+    if value is None or isinstance(value, bool):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, dict):
+        if "value" in value:
+            unit = value.get("unitText") or value.get("unit") or value.get("unitCode") or ""
+            return f"{_text(value['value'])} {unit}".strip()
+        return _text(value.get("name") or value.get("url") or value.get("display"))
+    if isinstance(value, list):
+        return _text(value[0]) if value else ""
+    return str(value).strip()
+
+
+def _number(text: str) -> Optional[float]:
+    try:
+        number = float(text.replace(",", ""))
+    except ValueError:
+        return None
+    return int(number) if number.is_integer() else number
+
+
+# The structured values are written the way the listing page shows them
+# ("177m2", "$1,130,000", "Listed on 20 May"), so both paths give one format
+AREA_UNITS = {"mtk": "m2", "m2": "m2", "m²": "m2", "sqm": "m2", "har": "ha", "ha": "ha"}
+AREA_RE = re.compile(r"^([\d.,]+)\s*([a-z²0-9]*)$", re.IGNORECASE)
+
+
+def _area(value) -> str:
+    if isinstance(value, dict) and "value" in value:
+        unit = value.get("unitCode") or value.get("unitText") or value.get("unit") or ""
+        value = f"{_text(value['value'])} {unit}"
+    text = _text(value)
+    match = AREA_RE.match(text)
+    if not match or _number(match.group(1)) is None:
+        return text
+    unit = AREA_UNITS.get(match.group(2).lower(), match.group(2)) or "m2"
+    return f"{_number(match.group(1))}{unit}"
+
+
+def _money(value) -> str:
+    text = _text(value.get("value") if isinstance(value, dict) else value)
+    number = _number(text.lstrip("$"))
+    return f"${number:,}" if number is not None else text
+
+
+def _listed(value) -> str:
+    text = _text(value)
+    try:
+        date = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        return text
+    return f"Listed on {date.day} {date:%b}"
+
+
+FORMATS = {"Floor Area": _area, "Land Area": _area, "Capital Value": _money, "Listing Date": _listed}
+
+
+def _ld_address(address) -> str:
+    if isinstance(address, dict):
+        parts = [address.get(k) for k in ("streetAddress", "addressLocality", "addressRegion")]
+        return ", ".join(p for p in parts if p)
+    return _text(address)
+
+
+def from_json_ld(blocks: List[str]) -> Dict[str, str]:
+    values: Dict[str, str] = {}
+    nodes = [n for text in blocks for n in _walk(_loads(text))]
+    listing = next((n for n in nodes if _types(n) & LISTING_LD_TYPES), None)
+    if listing:
+        offer = listing.get("offers") if isinstance(listing.get("offers"), dict) else {}
+        values["Property Address"] = _ld_address(listing.get("address")) or _text(listing.get("name"))
+        values["Primary Image URL"] = _text(listing.get("image") or listing.get("photo"))
+        values["Bedrooms"] = _text(listing.get("numberOfBedrooms"))
+        values["Bathrooms"] = _text(listing.get("numberOfBathroomsTotal") or listing.get("numberOfFullBathrooms"))
+        values["Floor Area"] = _area(listing.get("floorSize"))
+        values["Land Area"] = _area(listing.get("lotSize"))
+        values["Listing Date"] = _listed(listing.get("datePosted") or offer.get("availabilityStarts"))
+        values["Property Type"] = _text(listing.get("accommodationCategory") or listing.get("additionalType"))
+
+    agents = [n for n in nodes if _types(n) & AGENT_LD_TYPES and n.get("name")]
+    people = [n["name"] for n in agents if "Person" in _types(n)]
+    values["Agent Names"] = merge_names(people)
+    agency = next((n for n in nodes if _types(n) & AGENCY_LD_TYPES and "Person" not in _types(n) and n.get("name")),
+                  None)
+    values["Agency Name"] = _text(agency.get("name")) if agency else ""
+    return {k: v for k, v in values.items() if v}
+
+
+def find_listing_state(payloads: List[str]) -> Optional[Dict]:
+    """The dict in the app state that carries the most listing keys (JSON:API attributes included)."""
+    wanted = {key for keys in STATE_KEYS.values() for key in keys}
+    best, best_score = None, 2  # need at least three listing keys to trust it
+    for text in payloads:
+        for node in _walk(_loads(text)):
+            attrs = node.get("attributes") if isinstance(node.get("attributes"), dict) else node
+            score = len(wanted.intersection(attrs))
+            if score > best_score:
+                best, best_score = attrs, score
+    return best
+
+
+def from_app_state(payloads: List[str]) -> Dict[str, str]:
+    listing = find_listing_state(payloads)
+    if not listing:
+        return {}
+    values = {}
+    for field, keys in STATE_KEYS.items():
+        value = next((listing[k] for k in keys if listing.get(k) not in (None, "", [])), None)
+        if field == "Agent Names" and isinstance(value, list):
+            value = merge_names([_text(a.get("name") or a.get("full-name") or a.get("fullName"))
+                                 if isinstance(a, dict) else _text(a) for a in value])
+        values[field] = FORMATS.get(field, _text)(value)
+    return {k: v for k, v in values.items() if v}
+
+
+def parse_structured(payload: Optional[Dict]) -> Dict[str, Tuple[str, str]]:
+    """Returns {column: (value, path)} for every column the structured data fills."""
+    if not payload:
+        return {}
+    found = {}
+    for path, values in (("json-ld", from_json_ld(payload.get("ld") or [])),
+                         ("json", from_app_state(payload.get("json") or []))):
+        for field, value in values.items():
+            found.setdefault(field, (value, path))
+    return found
+
+
+class FieldCoverage:
+    """Counts which path (json-ld, json, dom or missing) filled each column."""
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.listings = 0
+
+    def record(self, paths: Dict[str, str]) -> None:
+        self.listings += 1
+        self.counts.update(paths.items())
+
+    def summary(self) -> str:
+        lines = [f"Field coverage over {self.listings} listings:"]
+        for field in FIELDS:
+            by_path = ", ".join(f"{path} {self.counts[(field, path)]}"
+                                for path in ("json-ld", "json", "dom", "missing") if self.counts[(field, path)])
+            lines.append(f"  {field}: {by_path or '-'}")
+        return "\n".join(lines)
@@ -1,33 +1,121 @@
+import argparse
 import asyncio
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 from bs4 import BeautifulSoup
-import pandas as pd
 from datetime import datetime
-import random
+import sys
 import time
+from pathlib import Path
 
-OUTPUT_FILE = "queenstown_listings.xlsx"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.row_sink import RowSink  # noqa: E402
+from common.tab_pool import HostPacer, TabPool  # noqa: E402
+from detail_json import FIELDS, STRUCTURED_DATA_JS, FieldCoverage, merge_names, parse_structured  # noqa: E402
+
+OUTPUT_FILE = "queenstown_listings.csv"  # .csv or .jsonl; rows are appended as they are scraped
+XLSX_FILE = "queenstown_listings.xlsx"  # built from OUTPUT_FILE at the end; None to skip
 BASE_URL = "https://www.realestate.co.nz"
 START_URL = "https://www.realestate.co.nz/residential/sale/central-otago-lakes-district/queenstown"
+RESULTS_TABS = 3  # results pages 2..N fetched concurrently
+DETAIL_TABS = 4  # listing pages fetched concurrently
+PACING = (0.5, 1.5)  # seconds between requests to the same host
+
+TILE_SELECTOR = 'div[data-test="tile"]'
+TILE_LINK_SELECTOR = "a:has(> div.listed-date:first-child)"
+PAGINATION_SELECTOR = 'div[data-test="paginated-items"]'
+
+# Counts the tiles and remembers their listing hrefs in the page, so a scroll
+# step never has to serialise the document back to Python
+TILE_STEP_JS = """
+({ tile, link }) => {
+    const hrefs = window.__tileHrefs = window.__tileHrefs || new Set();
+    const tiles = document.querySelectorAll(tile);
+    tiles.forEach((t) => {
+        const a = t.querySelector(link);
+        const href = a && a.getAttribute("href");
+        if (href) hrefs.add(href);
+    });
+    return tiles.length;
+}
+"""
+
+TILE_HREFS_JS = "() => window.__tileHrefs ? [...window.__tileHrefs] : []"
+
+TILE_GROWTH_JS = "({ tile, count }) => document.querySelectorAll(tile).length > count"
+
+# Reads just the requested columns from the listing page. The feature icons
+# (type, bedrooms, bathrooms...) are keyed by their <svg><title>, except the
+# first one, which is always the property type.
+DOM_FIELDS_JS = """
+(fields) => {
+    const text = (el) => el ? el.textContent.replace(/\\s+/g, " ").trim() : "";
+    const one = (selector) => text(document.querySelector(selector));
+    let features = null;
+    const feature = (name) => {
+        if (!features) {
+            features = {};
+            const container = document.querySelector('div[data-test="features-icons"]');
+            const blocks = container ? container.querySelectorAll("div.flex.items-center") : [];
+            blocks.forEach((block, i) => {
+                const title = block.querySelector("title");
+                const key = i === 0 ? "property_type"
+                    : title ? text(title).toLowerCase().replace(/ /g, "_") : "unknown";
+                features[key] = text(block.querySelector("span"));
+            });
+        }
+        return features[name] || "";
+    };
+    const readers = {
+        "Agent Names": () => [...document.querySelectorAll("div.property-agents h3")].map(text),
+        "Agency Name": () => one('div[data-test="agent-info__listing-agent-office"]'),
+        "Primary Image URL": () => {
+            const img = document.querySelector('div[data-test="photo-block"] img');
+            return (img && img.getAttribute("src")) || "";
+        },
+        "Property Address": () => one('h1[data-test="listing-title"]'),
+        "Sales Method": () => one('h3[data-test="pricing-method__price"]'),
+        "Property Type": () => feature("property_type"),
+        "Bedrooms": () => feature("bedroom"),
+        "Bathrooms": () => feature("bathroom"),
+        "Parking Space": () => feature("garage"),
+        "Floor Area": () => feature("floor_area"),
+        "Land Area": () => feature("land_area"),
+        "Listing Date": () => one('span[data-test="description__listed-date"]'),
+        "Capital Value": () => one('div[data-test="capital-valuation"] h4'),
+    };
+    const values = {};
+    for (const field of fields) {
+        if (readers[field]) values[field] = readers[field]();
+    }
+    return values;
+}
+"""
+
+PAGINATION_HTML_JS = "(selector) => { const el = document.querySelector(selector); return el ? el.outerHTML : ''; }"
+
 
-# Utility to pause scrolling to allow listings to load
-async def auto_scroll(page, max_retries=3, scroll_step=1000, pause_time=3):
+# Scroll until the tile count stops growing and return the listing URLs
+async def auto_scroll(page, max_retries=3, scroll_step=1000, growth_timeout=3):
 
     retries = 0
-    prev_listing_count = -1
-    start_time = time.time()
+    tiles = {"tile": TILE_SELECTOR, "link": TILE_LINK_SELECTOR}
+    prev_listing_count = await page.evaluate(TILE_STEP_JS, tiles)
 
     while retries < max_retries:
         # Scroll a bit down (not to bottom)
         await page.mouse.wheel(0, scroll_step)
-        await page.wait_for_timeout(pause_time * 1000)
-
-        # Count current listings
-        content = await page.content()
-        soup = BeautifulSoup(content, "html.parser")
-        listings = soup.select('div[data-test="tile"]')
-        curr_listing_count = len(listings)
 
+        # Wait for more tiles to mount, but no longer than growth_timeout
+        try:
+            await page.wait_for_function(
+                TILE_GROWTH_JS,
+                arg={"tile": TILE_SELECTOR, "count": prev_listing_count},
+                timeout=growth_timeout * 1000,
+            )
+        except PlaywrightTimeoutError:
+            pass
+
+        curr_listing_count = await page.evaluate(TILE_STEP_JS, tiles)
         print(f"Listings loaded: {curr_listing_count}")
 
         if curr_listing_count == prev_listing_count:
@@ -37,161 +125,151 @@ async def auto_scroll(page, max_retries=3, scroll_step=1000, pause_time=3):
             prev_listing_count = curr_listing_count
 
     print("Scrolling completed.")
-    return soup
+    return extract_listing_urls(await page.evaluate(TILE_HREFS_JS))
 
 
-# Scrape all listing URLs
-def extract_listing_urls(soup):
+# Turn harvested tile hrefs into unique absolute listing URLs
+def extract_listing_urls(hrefs):
     urls = []
-    for tile in soup.select('div[data-test="tile"]'):
-        anchor = tile.select_one("a:has(> div.listed-date:first-child)")
-        if anchor:
-            href = anchor["href"]
-            full_url = BASE_URL + href if href.startswith("/") else href
-            urls.append(full_url)
-
-    return list(set(urls))  # remove duplicates
-
-
-async def scrape_fetures(soup):
-    # Find the container with the features using the data-test attribute
-    container = soup.find("div", attrs={"data-test": "features-icons"})
-
-    # Initialize an empty dictionary to store the features
-    features = {}
-
-    # If the container exists
-    if container:
-        # Find all divs inside the container with class 'flex items-center'
-        feature_blocks = container.find_all("div", class_="flex items-center")
-        for i, feature_block in enumerate(feature_blocks):
-            # Extract the <title> from <svg> to identify the feature
-            title_tag = feature_block.find("title")
-            if title_tag:
-                feature_name = title_tag.get_text(strip=True).lower().replace(" ", "_")
-            else:
-                feature_name = "unknown"
-
-            # Extract the text from the <span> tag next to the icon
-            feature_text = feature_block.find("span").get_text(strip=True)
-
-            # For the first feature, use the key 'property_type'
-            if i == 0:
-                features['property_type'] = feature_text
-            else:
-                features[feature_name] = feature_text
-
-    return features
-
-# Scrape details from each listing page
-async def scrape_details(page, url):
+    for href in hrefs:
+        full_url = BASE_URL + href if href.startswith("/") else href
+        urls.append(full_url)
+
+    return list(dict.fromkeys(urls))  # remove duplicates, keep page order
+
+
+# Selector path: only the columns the structured data didn't fill are looked up
+async def scrape_dom_fields(page, fields):
+    if not fields:
+        return {}
+    values = await page.evaluate(DOM_FIELDS_JS, fields)
+    if "Agent Names" in values:
+        values["Agent Names"] = merge_names(values["Agent Names"])
+    return values
+
+# Scrape details from each listing page: JSON-LD / embedded JSON first, selectors per missing field
+async def scrape_details(page, url, coverage=None):
     await page.goto(url)
     await page.wait_for_load_state("load")
     extract_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    content = await page.content()
-    soup = BeautifulSoup(content, "html.parser")
-    agent_names = [h3.get_text(strip=True) for h3 in soup.select('div.property-agents h3')]
-    if len(agent_names) > 1:
-        merged_names = ', '.join(agent_names[:-1]) + ' & ' + agent_names[-1]
-    else:
-        merged_names = agent_names[0] if agent_names else ''
-
-    agency_name = soup.select_one('div[data-test="agent-info__listing-agent-office"]')
-    property_address = soup.select_one('h1[data-test="listing-title"]')
-    primary_image_url = ""
-    photo_block = soup.find("div", {"data-test": "photo-block"})
-    if photo_block:
-        img_tag = photo_block.find("img")
-        if img_tag and img_tag.get("src"):
-            primary_image_url = img_tag["src"]
-    sales_method = soup.select_one('h3[data-test="pricing-method__price"]')
-    features = await scrape_fetures(soup)
-    listed_date = soup.select_one('span[data-test="description__listed-date"]')
-    capital_value = soup.select_one('div[data-test="capital-valuation"] h4')
-    # Placeholder object
-    return {
-        "Extract Date": extract_date,
-        "Listing URL": url,
-        "Agent Names": merged_names,
-        "Agency Name": agency_name.get_text(strip=True) if agency_name else "",
-        "Primary Image URL": primary_image_url if primary_image_url else "",
-        "Property Address": property_address.get_text(strip=True) if property_address else "",
-        "Sales Method": sales_method.get_text(strip=True) if sales_method else "",
-        "Property Type": features.get("property_type",""),
-        "Bedrooms": features.get("bedroom",""),
-        "Bathrooms": features.get("bathroom",""),
-        "Parking Space": features.get("garage",""),
-        "Floor Area": features.get("floor_area",""),
-        "Land Area": features.get("land_area",""),
-        "Listing Date": listed_date.get_text(strip=True) if listed_date else "",
-        "Capital Value":  capital_value.get_text(strip=True) if capital_value else "",
-    }
+    structured = parse_structured(await page.evaluate(STRUCTURED_DATA_JS))
+    dom = await scrape_dom_fields(page, [field for field in FIELDS if field not in structured])
+
+    record = {"Extract Date": extract_date, "Listing URL": url}
+    paths = {}
+    for field in FIELDS:
+        if field in structured:
+            record[field], paths[field] = structured[field]
+        else:
+            record[field] = dom.get(field, "")
+            paths[field] = "dom" if record[field] else "missing"
+    if coverage is not None:
+        coverage.record(paths)
+    return record
+
+async def pagination_soup(page):
+    # Only the pagination block is parsed, not the whole results page
+    return BeautifulSoup(await page.evaluate(PAGINATION_HTML_JS, PAGINATION_SELECTOR), "html.parser")
 
 async def get_total_pages_from_soup(soup):
     page_links = soup.select('div[data-test="paginated-items"] > div > a.paginated-items__page-number')
     page_numbers = [int(a.text.strip()) for a in page_links if a.text.strip().isdigit()]
     return max(page_numbers) if page_numbers else 1
 
-# Main async function
-async def main(max_pages=3):
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
-        results = []
-
-        current_page = 1
-        START_URL_BASE = "https://www.realestate.co.nz/residential/sale/central-otago-lakes-district/queenstown"
-
-        while True:
-            current_url = START_URL_BASE if current_page == 1 else f"{START_URL_BASE}?page={current_page}"
-            print(f"\n--- Visiting page {current_page}: {current_url} ---")
-            await page.goto(current_url)
-            soup = await auto_scroll(page)
+def results_page_url(page_number):
+    return START_URL if page_number == 1 else f"{START_URL}?page={page_number}"
 
-            if current_page == 1:
-                total_pages = await get_total_pages_from_soup(soup)
-                total_pages = min(total_pages, max_pages)
-                print(f"Scraping up to {total_pages} page(s).")
 
-            urls = extract_listing_urls(soup)
-            print(f"Found {len(urls)} listing URLs on page {current_page}.")
+# Main async function: results pages feed a bounded pool of detail tabs
+async def main(max_pages=3, results_tabs=RESULTS_TABS, detail_tabs=DETAIL_TABS, output_file=OUTPUT_FILE,
+               xlsx_file=XLSX_FILE, resume=False):
+    sink = RowSink(output_file, key="Listing URL", resume=resume)
+    if sink.done:
+        print(f"Resuming: {len(sink.done)} listings already in '{output_file}'.")
 
-            page_results = []
-
-            for i, url in enumerate(urls, 1):
-                print(f"[Page {current_page} - {i}/{len(urls)}] Scraping: {url}")
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context()
+        pacer = HostPacer(*PACING)
+        detail_queue = asyncio.Queue()
+        seen_urls = set(sink.done)
+        queued = 0
+        failed = 0
+        coverage = FieldCoverage()
+        started_at = time.monotonic()
+
+        async def fetch_results_page(page, page_number):
+            url = results_page_url(page_number)
+            await pacer.wait(url)
+            print(f"\n--- Visiting page {page_number}: {url} ---")
+            await page.goto(url)
+            return await auto_scroll(page)
+
+        def enqueue(page_number, urls):
+            nonlocal queued
+            urls = [url for url in urls or [] if url not in seen_urls]
+            seen_urls.update(urls)
+            queued += len(urls)
+            print(f"Found {len(urls)} new listing URLs on page {page_number}.")
+            for url in urls:
+                detail_queue.put_nowait((page_number, url))
+
+        async def detail_worker(pool):
+            nonlocal failed
+            while True:
+                item = await detail_queue.get()
+                if item is None:
+                    break
+                page_number, url = item
                 try:
-                    data = await scrape_details(page, url)
-                    page_results.append(data)
-
-                    delay = random.uniform(1.5, 4.0)
-                    print(f"Sleeping for {delay:.2f} seconds...")
-                    await asyncio.sleep(delay)
+                    async with pool.page() as page:
+                        await pacer.wait(url)
+                        data = await scrape_details(page, url, coverage)
                 except Exception as e:
                     print(f"Error scraping {url}: {e}")
+                    failed += 1
                     continue
-
-            if page_results:
-                df = pd.DataFrame(page_results)
-                file_name = f"queenstown_page_{current_page}.xlsx"
-                df.to_excel(file_name, index=False)
-                print(f"✅ Saved page {current_page} data to '{file_name}'")
-
-            results.extend(page_results)
-
-            if current_page >= total_pages:
-                break
-
-            current_page += 1
+                sink.write(data)
+                rate = sink.count / max(time.monotonic() - started_at, 1e-6) * 60
+                print(f"[Page {page_number} - {sink.count + failed}/{queued}] Scraped: {url} ({rate:.1f} listings/min)")
+
+        async with TabPool(context, size=results_tabs) as results_pool, \
+                TabPool(context, size=detail_tabs) as detail_pool:
+            # Page 1 tells us how many results pages there are
+            async with results_pool.page() as page:
+                urls = await fetch_results_page(page, 1)
+                total_pages = await get_total_pages_from_soup(await pagination_soup(page))
+            total_pages = min(total_pages, max_pages)
+            print(f"Scraping up to {total_pages} page(s).")
+
+            workers = [asyncio.create_task(detail_worker(detail_pool)) for _ in range(detail_tabs)]
+            enqueue(1, urls)
+            await results_pool.map(fetch_results_page, range(2, total_pages + 1), on_result=enqueue)
+            for _ in workers:
+                detail_queue.put_nowait(None)
+            await asyncio.gather(*workers)
 
         await browser.close()
 
-        # Save results to Excel
-        df = pd.DataFrame(results)
-        df.to_excel("queenstown_listings.xlsx", index=False)
-        print(f"\n✅ Saved {len(results)} listings to 'queenstown_listings.xlsx'.")
+    sink.close()
+    elapsed = time.monotonic() - started_at
+    print(f"\n⏱️ {sink.count} listings in {elapsed / 60:.1f} min "
+          f"({sink.count / max(elapsed, 1e-6) * 60:.1f} listings/min), {failed} failed")
+    print(f"✅ Saved {sink.count} new listings to '{output_file}'.")
+    print(coverage.summary())
+
+    if xlsx_file:
+        exported = sink.export_xlsx(xlsx_file)
+        print(f"✅ Exported {exported} listings to '{xlsx_file}'.")
 
 # Run the script
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Scrape realestate.co.nz listings for Queenstown.")
+    parser.add_argument("--max-pages", type=int, default=3, help="Results pages to crawl")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Streaming output file (.csv or .jsonl)")
+    parser.add_argument("--xlsx", default=XLSX_FILE, help="Excel export built at the end ('' to skip)")
+    parser.add_argument("--resume", action="store_true", help="Append to --output and skip listings already in it")
+    args = parser.parse_args()
+    asyncio.run(main(max_pages=args.max_pages, output_file=args.output, xlsx_file=args.xlsx or None,
+                     resume=args.resume))
@@ -0,0 +1,157 @@
+"""
+Benchmark for detail_parser.scrape_detail.
+
+Runs the section-indexed parser and the previous implementation (kept
+verbatim below as legacy_scrape_detail) over saved detail pages, checks that
+every field the old parser returned is unchanged and reports the parse time
+per document.
+
+    python bench_parse_detail.py [page.html ...] [--runs N]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from detail_parser import scrape_detail
+
+HERE = Path(__file__).resolve().parent
+
+
+# --- Previous implementation, for comparison ---
+
+def legacy_scrape_detail(page_content):
+    soup = BeautifulSoup(page_content, "html.parser")
+    detail = {}
+
+    # Corporation Name
+    corp_name_div = soup.select_one("div.detailSection.corporationName")
+    if corp_name_div:
+        p_tags = corp_name_div.find_all("p")
+        if len(p_tags) >= 2:
+            corp_type = p_tags[0].get_text(strip=True)
+            corp_name = p_tags[1].get_text(strip=True)
+            detail["Corporation Name"] = f"{corp_type} {corp_name}"
+
+    # Filing Information
+    filing_info_div = soup.select_one("div.detailSection.filingInformation div")
+    fields = {
+        "Document Number": None,
+        "FEI/EIN Number": None,
+        "Date Filed": None,
+        "State": None,
+        "Status": None
+    }
+    if filing_info_div:
+        labels = filing_info_div.find_all("label")
+        for label in labels:
+            key = label.get_text(strip=True).replace(":", "")
+            if key in fields:
+                value_span = label.find_next_sibling("span")
+                if value_span:
+                    fields[key] = value_span.get_text(strip=True)
+    detail.update(fields)
+
+    # Principal Address
+    principal_div = None
+    for div in soup.find_all("div", class_="detailSection"):
+        span = div.find("span")
+        if span and "Principal Address" in span.text:
+            principal_div = div
+            break
+    if principal_div:
+        addr_div = principal_div.find("div")
+        if addr_div:
+            detail["Principal Address"] = ", ".join(line.strip() for line in addr_div.stripped_strings)
+
+    # Registered Agent Name
+    reg_agent_div = None
+    for div in soup.find_all("div", class_="detailSection"):
+        span = div.find("span")
+        if span and "Registered Agent Name" in span.text:
+            reg_agent_div = div
+            break
+    if reg_agent_div:
+        spans = reg_agent_div.find_all("span")
+        if len(spans) >= 2:
+            detail["Registered Agent Name"] = spans[1].get_text(strip=True)
+
+    # Officer/Director Detail - first two officers
+    officers = []
+    officer_div = None
+    for div in soup.find_all("div", class_="detailSection"):
+        span = div.find("span")
+        if span and "Officer/Director Detail" in span.text:
+            officer_div = div
+            break
+
+    if officer_div:
+        children = list(officer_div.children)
+        i = 0
+        while i < len(children) and len(officers) < 2:
+            child = children[i]
+            if getattr(child, "name", None) == "span":
+                text = child.get_text(strip=True)
+                if text.startswith("Title"):
+                    title = text.replace("Title", "").strip()
+                    i += 1
+                    while i < len(children) and (getattr(children[i], "name", None) == "br" or (hasattr(children[i], "get_text") and not children[i].get_text(strip=True))):
+                        i += 1
+                    if i >= len(children):
+                        break
+                    officer_name = None
+                    if getattr(children[i], "name", None) == "span":
+                        officer_name = children[i].get_text(strip=True)
+                    else:
+                        officer_name = str(children[i]).strip()
+                    officers.append({"Title": title, "Name": officer_name})
+            i += 1
+
+    if len(officers) > 0:
+        detail["1st Officer Title"] = f"Title {officers[0]['Title']}"
+        detail["1st Officer Name"] = officers[0]["Name"]
+    if len(officers) > 1:
+        detail["2nd Officer Title"] = f"Title {officers[1]['Title']}"
+        detail["2nd Officer Name"] = officers[1]["Name"]
+
+    return detail
+
+
+def time_per_page(parse, html, runs):
+    started = time.perf_counter()
+    for _ in range(runs):
+        parse(html)
+    return (time.perf_counter() - started) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scrape_detail against the previous implementation.")
+    parser.add_argument("files", nargs="*", default=[str(HERE / "sample_detail.html")], help="Saved detail-page HTML files")
+    parser.add_argument("--runs", type=int, default=50, help="Parses per file and implementation (default: 50)")
+    args = parser.parse_args()
+
+    mismatches = 0
+    total_old = total_new = 0.0
+    for path in args.files:
+        html = Path(path).read_text(encoding="utf-8")
+        old_detail, new_detail = legacy_scrape_detail(html), scrape_detail(html)
+        # The new parser adds officers past the second, annual reports and document images
+        if any(new_detail.get(key) != value for key, value in old_detail.items()):
+            mismatches += 1
+            print(f"MISMATCH: {path}", file=sys.stderr)
+        old = time_per_page(legacy_scrape_detail, html, args.runs)
+        new = time_per_page(scrape_detail, html, args.runs)
+        total_old += old
+        total_new += new
+        officers = sum(1 for key in new_detail if key.endswith("Officer Name"))
+        print(f"{Path(path).name}: legacy {old * 1000:.2f} ms/doc, indexed {new * 1000:.2f} ms/doc "
+              f"({old / new:.2f}x), {officers} officer(s)")
+
+    print(f"Overall: {total_old / total_new:.2f}x faster over {len(args.files)} page(s), {mismatches} mismatch(es)")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
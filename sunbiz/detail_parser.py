@@ -0,0 +1,153 @@
+from urllib.parse import urljoin
+
+import lxml.html
+from lxml import etree
+
+BASE_URL = "https://search.sunbiz.org"
+FILING_FIELDS = ["Document Number", "FEI/EIN Number", "Date Filed", "State", "Status"]
+
+DETAIL_SECTIONS = etree.XPath('//div[contains(concat(" ", normalize-space(@class), " "), " detailSection ")]')
+
+
+def text(el):
+    return el.text_content().strip() if el is not None else ""
+
+
+def ordinal(n):
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+def index_sections(doc):
+    """One pass over the detailSections: {heading: section}."""
+    sections = {}
+    for div in DETAIL_SECTIONS(doc):
+        classes = (div.get("class") or "").split()
+        if "corporationName" in classes:
+            sections["Corporation Name"] = div
+        elif "filingInformation" in classes:
+            sections["Filing Information"] = div
+        else:
+            span = div.find("span")
+            if span is not None:
+                sections.setdefault(text(span), div)
+    return sections
+
+
+def section(sections, prefix):
+    return next((div for heading, div in sections.items() if heading.startswith(prefix)), None)
+
+
+def child_nodes(el):
+    """Element children and the text between them, in document order (like bs4's .children)."""
+    if el.text:
+        yield el.text
+    for child in el:
+        if isinstance(child.tag, str):
+            yield child
+        if child.tail:
+            yield child.tail
+
+
+def parse_officers(officer_div):
+    """Every (title, name) pair in the Officer/Director section, in page order."""
+    officers = []
+    current = None
+    for child in child_nodes(officer_div):
+        if isinstance(child, str):
+            value = child.strip()
+            if value and current is not None and current["Name"] is None:
+                current["Name"] = value
+            continue
+        if child.tag == "br":
+            continue
+        value = text(child)
+        if child.tag == "span" and value.startswith("Title"):
+            current = {"Title": value.replace("Title", "", 1).strip(), "Name": None}
+            officers.append(current)
+        elif current is not None and current["Name"] is None and value:
+            current["Name"] = value
+    return officers
+
+
+def parse_annual_reports(report_div):
+    reports = []
+    for row in report_div.iter("tr"):
+        cells = [text(td) for td in row.findall("td")]
+        if len(cells) >= 2 and cells[0].isdigit():
+            reports.append({"Report Year": cells[0], "Filed Date": cells[1]})
+    return reports
+
+
+def parse_document_images(images_div):
+    images = []
+    for row in images_div.iter("tr"):
+        link = row.find(".//a[@href]")
+        if link is None:
+            continue
+        date, _, description = text(link).partition("--")
+        images.append({
+            "Date": date.strip(),
+            "Description": description.strip(),
+            "URL": urljoin(BASE_URL, link.get("href")),
+        })
+    return images
+
+
+def scrape_detail(page_content):
+    detail = {}
+    fields = dict.fromkeys(FILING_FIELDS)
+    try:
+        doc = lxml.html.fromstring(page_content)
+    except (etree.ParserError, ValueError):
+        detail.update(fields)
+        return detail
+    sections = index_sections(doc)
+
+    # Corporation Name
+    corp_name_div = sections.get("Corporation Name")
+    if corp_name_div is not None:
+        p_tags = corp_name_div.findall(".//p")
+        if len(p_tags) >= 2:
+            detail["Corporation Name"] = f"{text(p_tags[0])} {text(p_tags[1])}"
+
+    # Filing Information
+    filing_div = sections.get("Filing Information")
+    filing_info = filing_div.find("div") if filing_div is not None else None
+    if filing_info is not None:
+        for label in filing_info.iter("label"):
+            key = text(label).replace(":", "")
+            if key in fields:
+                value_span = next(label.itersiblings("span"), None)
+                if value_span is not None:
+                    fields[key] = text(value_span)
+    detail.update(fields)
+
+    # Principal Address
+    principal_div = section(sections, "Principal Address")
+    addr_div = principal_div.find(".//div") if principal_div is not None else None
+    if addr_div is not None:
+        detail["Principal Address"] = ", ".join(line.strip() for line in addr_div.itertext() if line.strip())
+
+    # Registered Agent Name
+    reg_agent_div = section(sections, "Registered Agent Name")
+    if reg_agent_div is not None:
+        spans = reg_agent_div.findall(".//span")
+        if len(spans) >= 2:
+            detail["Registered Agent Name"] = text(spans[1])
+
+    # Officer/Director Detail - every officer
+    officer_div = section(sections, "Officer/Director Detail")
+    for n, officer in enumerate(parse_officers(officer_div) if officer_div is not None else [], 1):
+        detail[f"{ordinal(n)} Officer Title"] = f"Title {officer['Title']}"
+        detail[f"{ordinal(n)} Officer Name"] = officer["Name"]
+
+    reports_div = section(sections, "Annual Reports")
+    if reports_div is not None:
+        detail["Annual Reports"] = parse_annual_reports(reports_div)
+
+    images_div = section(sections, "Document Images")
+    if images_div is not None:
+        detail["Document Images"] = parse_document_images(images_div)
+
+    return detail
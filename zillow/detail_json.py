@@ -0,0 +1,130 @@
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+# Returns only the text of the script that carries the property JSON, so the
+# page never has to be serialised or parsed as a whole document.
+PROPERTY_SCRIPT_JS = """
+() => {
+    for (const id of ["__NEXT_DATA__", "hdpApolloPreloadedData"]) {
+        const el = document.getElementById(id);
+        if (el && el.textContent) return el.textContent;
+    }
+    return null;
+}
+"""
+
+
+@dataclass
+class ListingRecord:
+    url: str
+    zpid: str = ""
+    price: str = ""
+    address: str = ""
+    beds: str = ""
+    baths: str = ""
+    sqft: str = ""
+    status: str = ""
+    facts: List[str] = field(default_factory=list)
+    specials: List[str] = field(default_factory=list)
+    agent: str = ""
+    price_history: List[Dict] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _loads(value):
+    # gdpClientCache / apiCache are JSON documents stored as strings
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+    return value
+
+
+def find_property(payload) -> Optional[Dict]:
+    """Finds the property object in a __NEXT_DATA__ or Apollo preload payload."""
+    data = _loads(payload)
+    if not isinstance(data, dict):
+        return None
+    props = (data.get("props") or {}).get("pageProps") or {}
+    caches = [
+        (props.get("componentProps") or {}).get("gdpClientCache"),
+        props.get("gdpClientCache"),
+        data.get("apiCache"),
+    ]
+    for cache in caches:
+        cache = _loads(cache)
+        if not isinstance(cache, dict):
+            continue
+        for entry in cache.values():
+            if isinstance(entry, dict) and isinstance(entry.get("property"), dict):
+                return entry["property"]
+    return None
+
+
+def _number(value, prefix: str = "") -> str:
+    if value in (None, ""):
+        return ""
+    if isinstance(value, (int, float)):
+        value = int(value) if float(value).is_integer() else value
+        return f"{prefix}{value:,}"
+    return str(value)
+
+
+def listing_from_property(url: str, prop: Dict) -> ListingRecord:
+    address = prop.get("address") or {}
+    state_zip = " ".join(p for p in [address.get("state"), address.get("zipcode")] if p)
+    address_text = ", ".join(p for p in [address.get("streetAddress"), address.get("city"), state_zip] if p)
+
+    reso = prop.get("resoFacts") or {}
+    facts = [
+        f"{fact.get('factLabel')} {fact.get('factValue')}".strip()
+        for fact in reso.get("atAGlanceFacts") or []
+        if fact.get("factValue")
+    ]
+
+    specials = []
+    for insight in prop.get("homeInsights") or []:
+        for item in insight.get("insights") or []:
+            specials.extend(p for p in item.get("phrases") or [] if p)
+
+    attribution = prop.get("attributionInfo") or {}
+    agent = " | ".join(p for p in [attribution.get("agentName"), attribution.get("brokerName")] if p)
+
+    price_history = [
+        {
+            "date": event.get("date", ""),
+            "event": event.get("event", ""),
+            "price": event.get("price", ""),
+            "source": event.get("source", ""),
+        }
+        for event in prop.get("priceHistory") or []
+    ]
+
+    return ListingRecord(
+        url=url,
+        zpid=str(prop.get("zpid") or ""),
+        price=_number(prop.get("price"), "$"),
+        address=address_text,
+        beds=_number(prop.get("bedrooms")),
+        baths=_number(prop.get("bathrooms")),
+        sqft=_number(prop.get("livingArea")),
+        status=prop.get("homeStatus") or "",
+        facts=facts,
+        specials=specials,
+        agent=agent,
+        price_history=price_history,
+    )
+
+
+def parse_listing_json(url: str, script_text: Optional[str]) -> Optional[ListingRecord]:
+    """Decodes the embedded property payload; None when the page doesn't carry one."""
+    if not script_text:
+        return None
+    prop = find_property(script_text)
+    if not prop:
+        return None
+    return listing_from_property(url, prop)
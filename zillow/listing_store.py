@@ -0,0 +1,135 @@
+import json
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional
+
+DETAIL_FIELDS = ["zpid", "price", "address", "beds", "baths", "sqft", "status", "facts", "specials", "agent",
+                 "price_history"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    url TEXT PRIMARY KEY,   -- canonical detail URL (it already embeds the zpid)
+    zpid TEXT,
+    card_price TEXT,
+    card_status TEXT,
+    price TEXT,
+    address TEXT,
+    beds TEXT,
+    baths TEXT,
+    sqft TEXT,
+    status TEXT,
+    facts TEXT,
+    specials TEXT,
+    agent TEXT,
+    price_history TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    details_fetched TEXT
+);
+CREATE INDEX IF NOT EXISTS listings_zpid ON listings (zpid);
+CREATE INDEX IF NOT EXISTS listings_last_seen ON listings (last_seen);
+CREATE TABLE IF NOT EXISTS listing_history (
+    url TEXT NOT NULL,
+    changed_at TEXT NOT NULL,
+    field TEXT NOT NULL,
+    old_value TEXT,
+    new_value TEXT
+);
+CREATE INDEX IF NOT EXISTS listing_history_url ON listing_history (url);
+"""
+
+
+def _text(value) -> str:
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return "" if value is None else str(value)
+
+
+class ListingStore:
+    """
+    Local SQLite store of every listing seen across runs.
+
+    Cards from the search results are upserted first; ``upsert_card`` says
+    whether the detail page has to be fetched again (new listing, details
+    never fetched, or the card-level price/status changed). Price and status
+    changes are written to ``listing_history``; a changed card also clears
+    ``details_fetched`` so a failed detail fetch is retried on the next run.
+    """
+
+    def __init__(self, path: str = "zillow_listings.db"):
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.run_at = datetime.now().isoformat(timespec="seconds")
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    def _row(self, url: str) -> Optional[sqlite3.Row]:
+        return self.conn.execute("SELECT * FROM listings WHERE url = ?", (url,)).fetchone()
+
+    def _track(self, url: str, field: str, old: Optional[str], new: str) -> bool:
+        if not new or old == new:
+            return False
+        if old:
+            self.conn.execute(
+                "INSERT INTO listing_history (url, changed_at, field, old_value, new_value) VALUES (?, ?, ?, ?, ?)",
+                (url, self.run_at, field, old, new),
+            )
+        return True
+
+    def upsert_card(self, card: Dict) -> bool:
+        """Records a search-result card; returns True if its details need (re)fetching."""
+        url = card["url"]
+        price, status = _text(card.get("price")), _text(card.get("status"))
+        row = self._row(url)
+        if row is None:
+            self.conn.execute(
+                "INSERT INTO listings (url, zpid, card_price, card_status, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, _text(card.get("zpid")), price, status, self.run_at, self.run_at),
+            )
+            return True
+
+        price_changed = self._track(url, "card_price", row["card_price"], price)
+        status_changed = self._track(url, "card_status", row["card_status"], status)
+        changed = price_changed or status_changed
+        # The card fields move on now, so a failed detail fetch has to stay visible as "never fetched"
+        self.conn.execute(
+            "UPDATE listings SET card_price = COALESCE(NULLIF(?, ''), card_price), "
+            "card_status = COALESCE(NULLIF(?, ''), card_status), last_seen = ?, "
+            "details_fetched = CASE WHEN ? THEN NULL ELSE details_fetched END WHERE url = ?",
+            (price, status, self.run_at, changed, url),
+        )
+        # Without card-level price/status (DOM fallback) there is nothing to compare against
+        unknown = not price and not status
+        return changed or unknown or not row["details_fetched"]
+
+    def save_details(self, record: Dict) -> None:
+        url = record["url"]
+        values = {field: _text(record.get(field)) for field in DETAIL_FIELDS}
+        row = self._row(url)
+        if row is None:
+            self.upsert_card(record)
+        else:
+            self._track(url, "price", row["price"], values["price"])
+            self._track(url, "status", row["status"], values["status"])
+        assignments = ", ".join(f"{field} = ?" for field in DETAIL_FIELDS)
+        self.conn.execute(
+            f"UPDATE listings SET {assignments}, last_seen = ?, details_fetched = ? WHERE url = ?",
+            [values[field] for field in DETAIL_FIELDS] + [self.run_at, self.run_at, url],
+        )
+        self.conn.commit()
+
+    def seen_this_run(self) -> List[Dict]:
+        """Every listing seen in this run, including ones whose details were reused."""
+        rows = self.conn.execute(
+            "SELECT url, " + ", ".join(DETAIL_FIELDS) + " FROM listings WHERE last_seen = ? ORDER BY first_seen, url",
+            (self.run_at,),
+        ).fetchall()
+        return [dict(row) for row in rows]
@@ -1,4 +1,7 @@
 import asyncio
+import json
+import sys
+from pathlib import Path
 from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
 import pandas as pd
@@ -6,16 +9,25 @@ import random
 import logging
 from urllib.parse import urljoin
 
-ZILLOW_SEARCH_URL = "https://www.zillow.com/homes/for_sale/Los-Angeles_rb/"  # Use local city if needed
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.request_filter import RequestFilter  # noqa: E402
+from common.tab_pool import HostPacer, TabPool  # noqa: E402
+from detail_json import PROPERTY_SCRIPT_JS, ListingRecord, parse_listing_json  # noqa: E402
+from listing_store import DETAIL_FIELDS, ListingStore  # noqa: E402
 
-BLOCKED_EXT = (".png", ".jpg", ".jpeg", ".svg", ".gif", ".css", ".woff", ".woff2", ".ttf",".webp")
-BLOCKED_DOMAINS = [
-    "googletagmanager", "google-analytics", "doubleclick",
-    "facebook", "twitter", "linkedin",
-    "scorecardresearch", "quantserve", "adsystem",
-    "pubmatic", "criteo", "taboola", "outbrain",
-    "adsrvr","doubleclick"
-]
+ZILLOW_SEARCH_URL = "https://www.zillow.com/homes/for_sale/Los-Angeles_rb/"  # Use local city if needed
+CAPTURE_SEARCH_JSON = True  # read cards from the search-results JSON; DOM scrolling is the fallback
+SEARCH_STATE_API = "https://www.zillow.com/async-create-search-page-state"
+SEARCH_STATE_PATTERNS = ("async-create-search-page-state", "GetSearchPageState.htm")
+MAX_SEARCH_PAGES = 20
+DETAIL_TABS = 4  # concurrent detail tabs inside the persistent context
+MAX_LISTINGS = 0  # 0 = every listing found
+PACING = (0.5, 1.5)  # seconds between requests to the same host
+STORE_PATH = "zillow_listings.db"  # listings seen across runs; unchanged cards skip the detail fetch
+
+# Shared resource blocking (see common/request_filter.py)
+REQUEST_FILTER = RequestFilter()
+TAB_STATS = {}  # page -> BlockStats of that tab
 
 STEALTH_JS = """
 // navigator.webdriver = false
@@ -51,10 +63,44 @@ Object.defineProperty(HTMLDivElement.prototype, "offsetHeight", {
 });
 """
 
-def should_block(url: str) -> bool:
-    if url.lower().endswith(BLOCKED_EXT):
-        return True
-    return any(d in url.lower() for d in BLOCKED_DOMAINS)
+CARD_LINK_SELECTOR = "ul.photo-cards li article a[data-test='property-card-link']"
+
+# Installed once on the search page: remembers every card link that mounts
+CARD_COLLECTOR_JS = """
+(selector) => {
+    if (window.__cardCollector) return;
+    const c = window.__cardCollector = { seen: new Set(), pending: [] };
+    const add = (a) => {
+        const href = a.getAttribute("href");
+        if (href && !c.seen.has(href)) {
+            c.seen.add(href);
+            c.pending.push(href);
+        }
+    };
+    const scan = (node) => {
+        if (node.nodeType !== 1) return;
+        if (node.matches(selector)) add(node);
+        node.querySelectorAll(selector).forEach(add);
+    };
+    scan(document.body);
+    new MutationObserver((mutations) => {
+        for (const m of mutations) {
+            if (m.type === "attributes") scan(m.target);
+            else m.addedNodes.forEach(scan);
+        }
+    }).observe(document.body, { childList: true, subtree: true, attributes: true, attributeFilter: ["href"] });
+}
+"""
+
+# One round-trip per scroll step: new hrefs since the last call, page height, then scroll
+CARD_STEP_JS = """
+(step) => {
+    const hrefs = window.__cardCollector.pending.splice(0);
+    const height = document.body.scrollHeight;
+    window.scrollBy(0, step);
+    return { hrefs, height };
+}
+"""
 
 async def delay(min_delay: float = 0.5, max_delay: float = 1.5) -> None:
     """
@@ -75,12 +121,6 @@ async def get_context(p, proxy=None):
         "--disable-dev-shm-usage",
     ]
 
-    # Pick a random viewport for realism
-    viewport = {
-        "width": random.randint(1200, 1600),
-        "height": random.randint(700, 1000)
-    }
-
     context = await p.chromium.launch_persistent_context(
         user_data_dir="./data-patchright",
         channel="chrome",
@@ -95,14 +135,7 @@ async def get_context(p, proxy=None):
 
     # Create a page and apply viewport
     page = await context.new_page()
-    await page.set_viewport_size(viewport)
-
-    await page.route(
-        "**/*",
-        lambda route: asyncio.create_task(route.abort())
-        if should_block(route.request.url)
-        else asyncio.create_task(route.continue_())
-    )
+    await setup_tab(page)
 
     # Optional: set a realistic user-agent string
     # await page.set_extra_http_headers({
@@ -111,180 +144,371 @@ async def get_context(p, proxy=None):
     #                   "Chrome/120.0.0.0 Safari/537.36"
     # })
 
-    return context, page
+    return context, page, TAB_STATS[page]
+
+
+async def setup_tab(page):
+    """Per-tab setup: random viewport plus route blocking with its own counters."""
+    # Pick a random viewport for realism
+    viewport = {
+        "width": random.randint(1200, 1600),
+        "height": random.randint(700, 1000)
+    }
+    await page.set_viewport_size(viewport)
+
+    stats = REQUEST_FILTER.new_stats()
+    TAB_STATS[page] = stats
+    await page.route("**/*", REQUEST_FILTER.async_handler(stats))
 
 async def extract_listing_details(page, url):
     try:
         await page.goto(url, timeout=1200000, wait_until="domcontentloaded")
 
-        html = await page.content()
-        soup = BeautifulSoup(html, "html.parser")
+        # Fast path: decode only the embedded property JSON
+        record = parse_listing_json(url, await page.evaluate(PROPERTY_SCRIPT_JS))
+        if record is None:
+            print(f"[i] No property JSON on {url}, parsing the DOM")
+            record = parse_listing_dom(url, await page.content())
+        return record.to_dict()
+    except Exception as e:
+        print(f"[!] Error extracting {url}: {e}")
+        return None
+
+
+def parse_listing_dom(url, html):
+    """Fallback for pages without the embedded property JSON."""
+    soup = BeautifulSoup(html, "html.parser")
 
-        price_tag = soup.find(attrs={"data-testid": "price"})
-        if price_tag:
-            price = price_tag.get_text(strip=True)
+    price_tag = soup.find(attrs={"data-testid": "price"})
+    if price_tag:
+        price = price_tag.get_text(strip=True)
+    else:
+        # fallback: find <span> with class containing "price-text"
+        span_tag = soup.find("span", class_=lambda c: c and "price-text" in c)
+        if span_tag:
+            price = span_tag.get_text(strip=True)
         else:
-            # fallback: find <span> with class containing "price-text"
-            span_tag = soup.find("span", class_=lambda c: c and "price-text" in c)
-            if span_tag:
-                price = span_tag.get_text(strip=True)
-            else:
-                price = ""
-
-        address = soup.select_one("h1").get_text(strip=True) if soup.select_one("h1") else ""
-
-        # all the fact containers
-        containers = soup.find_all("div", {"data-testid": "bed-bath-sqft-fact-container"})
-
-        labels = ["beds", "baths", "sqft"]  # expected order
-        result = {}
-
-        if containers:
-            for i, container in enumerate(containers):
-                first_span = container.find("span")
-                if first_span and i < len(labels):
-                    result[labels[i]] = first_span.get_text(strip=True)
+            price = ""
+
+    address = soup.select_one("h1").get_text(strip=True) if soup.select_one("h1") else ""
+
+    # all the fact containers
+    containers = soup.find_all("div", {"data-testid": "bed-bath-sqft-fact-container"})
+
+    labels = ["beds", "baths", "sqft"]  # expected order
+    result = {}
+
+    if containers:
+        for i, container in enumerate(containers):
+            first_span = container.find("span")
+            if first_span and i < len(labels):
+                result[labels[i]] = first_span.get_text(strip=True)
+    else:
+        # Fallback: look inside desktop-bed-bath-sqft
+        desktop_div = soup.find("div", {"data-testid": "desktop-bed-bath-sqft"})
+        if desktop_div:
+            spans = desktop_div.find_all("span", {"data-testid": "bed-bath-sqft-text__value"})
+            for i, span in enumerate(spans):
+                if i < len(labels):
+                    result[labels[i]] = span.get_text(strip=True)
+
+    glance_div = soup.find("div", {"aria-label": "At a glance facts"})
+
+    if not glance_div:
+        glance_div = soup.find("div", {"data-testid": "at-a-glance"})
+
+    facts = []
+    if glance_div:
+        for inner_div in glance_div.find_all("div", recursive=False):
+            spans = [s.get_text(strip=True) for s in inner_div.find_all("span")]
+            if spans:
+                facts.append(" ".join(spans))
+
+    specials = []
+
+    # Find the <h2> with exact text "What's special"
+    h2_tag = soup.find("h2", string=lambda t: t and "What's special" in t)
+
+    if h2_tag:
+        # Get its first sibling <div>
+        sibling_div = h2_tag.find_next_sibling("div")
+        if sibling_div:
+            # Find <div role="list"> inside
+            list_div = sibling_div.find("div", {"role": "list"})
+            if list_div:
+                # Find all <span role="listitem">
+                spans = list_div.find_all("span", {"role": "listitem"})
+                specials = [s.get_text(strip=True) for s in spans if s.get_text(strip=True)]
+
+    agent = ""
+
+    agent_div = soup.find("div", {"data-testid": "enhanced-agent-card"})
+    if agent_div:
+        p_tags = agent_div.find_all("p")
+        parts = []
+        if len(p_tags) > 0:
+            parts.append(p_tags[0].get_text(strip=True))  # agent name
+        if len(p_tags) > 1:
+            parts.append(p_tags[1].get_text(strip=True))  # agent company
+        agent = " | ".join(parts)  # join with separator
+
+    return ListingRecord(
+        url=url,
+        price=price,
+        address=address,
+        beds=result.get("beds", ""),
+        baths=result.get("baths", ""),
+        sqft=result.get("sqft", ""),
+        facts=facts,
+        specials=specials,
+        agent=agent,
+    )
+
+async def harvest_card_urls(page, max_scrolls=50, scroll_step=800, pause=1.5, no_new_limit=3):
+    """
+    Scrolls the results list and returns the unique listing URLs.
+
+    A collector is injected once; it records property-card hrefs as the cards
+    mount (Zillow unmounts them again further down the list), so each scroll
+    step is a single evaluate() that drains only the new hrefs.
+    """
+    await page.evaluate(CARD_COLLECTOR_JS, CARD_LINK_SELECTOR)
+
+    seen_urls = set()
+    no_new_count = 0
+    last_height = None
+
+    for i in range(max_scrolls):
+        step = await page.evaluate(CARD_STEP_JS, scroll_step)
+        current_count = len(seen_urls)
+
+        for href in step["hrefs"]:
+            seen_urls.add(urljoin("https://www.zillow.com", href.split("?")[0]))
+
+        # check if we found new URLs
+        if len(seen_urls) == current_count:
+            no_new_count += 1
         else:
-            # Fallback: look inside desktop-bed-bath-sqft
-            desktop_div = soup.find("div", {"data-testid": "desktop-bed-bath-sqft"})
-            if desktop_div:
-                spans = desktop_div.find_all("span", {"data-testid": "bed-bath-sqft-text__value"})
-                for i, span in enumerate(spans):
-                    if i < len(labels):
-                        result[labels[i]] = span.get_text(strip=True)
-
-        glance_div = soup.find("div", {"aria-label": "At a glance facts"})
-
-        if not glance_div:
-            glance_div = soup.find("div", {"data-testid": "at-a-glance"})
-
-        facts = []
-        if glance_div:
-            for inner_div in glance_div.find_all("div", recursive=False):
-                spans = [s.get_text(strip=True) for s in inner_div.find_all("span")]
-                if spans:
-                    facts.append(" ".join(spans))
-
-        specials = []
-
-        # Find the <h2> with exact text "What's special"
-        h2_tag = soup.find("h2", string=lambda t: t and "What's special" in t)
-
-        if h2_tag:
-            # Get its first sibling <div>
-            sibling_div = h2_tag.find_next_sibling("div")
-            if sibling_div:
-                # Find <div role="list"> inside
-                list_div = sibling_div.find("div", {"role": "list"})
-                if list_div:
-                    # Find all <span role="listitem">
-                    spans = list_div.find_all("span", {"role": "listitem"})
-                    specials = [s.get_text(strip=True) for s in spans if s.get_text(strip=True)]
-
-        agent = ""
-
-        agent_div = soup.find("div", {"data-testid": "enhanced-agent-card"})
-        if agent_div:
-            p_tags = agent_div.find_all("p")
-            parts = []
-            if len(p_tags) > 0:
-                parts.append(p_tags[0].get_text(strip=True))  # agent name
-            if len(p_tags) > 1:
-                parts.append(p_tags[1].get_text(strip=True))  # agent company
-            agent = " | ".join(parts)  # join with separator
-
-        return {
-            "url": url,
-            "price": price,
-            "address": address,
-            "beds": result.get("beds", ""),
-            "baths": result.get("baths", ""),
-            "sqft": result.get("sqft", ""),
-            "facts": facts,
-            "specials": specials,
-            "agent": agent
-        }
-    except Exception as e:
-        print(f"[!] Error extracting {url}: {e}")
+            no_new_count = 0  # reset if new URLs found
+
+        print(f"Step {i+1}: collected {len(seen_urls)} unique listings")
+
+        if no_new_count >= no_new_limit:
+            print("🔚 No new listings after several steps, stopping scroll")
+            break
+
+        # check if page height stopped growing since the previous step
+        if step["height"] == last_height:
+            print("🔚 Reached bottom of page")
+            break
+        last_height = step["height"]
+
+        await asyncio.sleep(pause)
+
+    return seen_urls
+
+
+def card_from_result(item):
+    """Maps one listResults/mapResults entry to the card-level fields we keep."""
+    zpid = str(item.get("zpid") or "")
+    detail_url = item.get("detailUrl") or ""
+    if not zpid or not detail_url:
         return None
-    finally:
-        await page.close()
+    home_info = (item.get("hdpData") or {}).get("homeInfo") or {}
+    sqft = item.get("area") or home_info.get("livingArea") or ""
+    return {
+        "zpid": zpid,
+        "url": urljoin("https://www.zillow.com", detail_url.split("?")[0]),
+        "price": item.get("price") or home_info.get("price") or "",
+        "beds": item.get("beds", home_info.get("bedrooms", "")),
+        "baths": item.get("baths", home_info.get("bathrooms", "")),
+        "sqft": sqft,
+        "status": item.get("statusType") or home_info.get("homeStatus") or "",
+    }
+
+
+def parse_search_results(payload):
+    """Returns (cards, total_pages) from a search-page-state response."""
+    cat = payload.get("cat1") or payload
+    results = cat.get("searchResults") or {}
+    cards = []
+    for item in (results.get("listResults") or []) + (results.get("mapResults") or []):
+        card = card_from_result(item)
+        if card:
+            cards.append(card)
+    total_pages = (cat.get("searchList") or {}).get("totalPages") or 1
+    return cards, total_pages
+
+
+# Replays the search request from inside the page so cookies and headers match the site's own calls
+FETCH_SEARCH_JS = """
+async ({ url, method, body }) => {
+    const response = await fetch(url, {
+        method,
+        body,
+        credentials: "include",
+        headers: { "content-type": "application/json" },
+    });
+    return response.ok ? await response.json() : null;
+}
+"""
 
-async def scrape_zillow():
+NEXT_DATA_QUERY_STATE_JS = """
+() => {
+    const el = document.getElementById("__NEXT_DATA__");
+    if (!el) return null;
+    try {
+        const state = JSON.parse(el.textContent).props.pageProps.searchPageState;
+        return state ? state.queryState : null;
+    } catch (e) {
+        return null;
+    }
+}
+"""
+
+
+def watch_search_json(page):
+    """
+    Starts listening for the search-results XHR. Must be called before goto;
+    the returned future resolves to (request url, method, body, payload).
+    """
+    captured = asyncio.get_running_loop().create_future()
+
+    async def on_response(response):
+        if captured.done() or not any(p in response.url for p in SEARCH_STATE_PATTERNS):
+            return
+        if not response.ok:
+            return
+        try:
+            payload = await response.json()
+        except Exception:
+            return
+        request = response.request
+        if not captured.done():
+            captured.set_result((request.url, request.method, request.post_data, payload))
+
+    page.on("response", on_response)
+    return captured
+
+
+async def collect_search_cards(page, captured, wait=15, max_pages=MAX_SEARCH_PAGES):
+    """
+    Reads cards straight from the search-results JSON and pages through the
+    result set by replaying that request with a new currentPage. Returns
+    {url: card}; empty if no JSON could be captured.
+    """
+    try:
+        url, method, body, payload = await asyncio.wait_for(asyncio.shield(captured), timeout=wait)
+    except asyncio.TimeoutError:
+        # No XHR seen; build the same request from the server-rendered query state
+        query_state = await page.evaluate(NEXT_DATA_QUERY_STATE_JS)
+        if not query_state:
+            print("⚠️ No search-results JSON found, falling back to scrolling")
+            return {}
+        url, method, payload = SEARCH_STATE_API, "PUT", None
+        body = json.dumps({
+            "searchQueryState": query_state,
+            "wants": {"cat1": ["listResults", "mapResults"], "cat2": ["total"]},
+            "requestId": 2,
+            "isDebugRequest": False,
+        })
+
+    if method == "GET" or not body:
+        # Older GET endpoint: nothing to replay, keep what the page already loaded
+        cards, _ = parse_search_results(payload or {})
+        return {card["url"]: card for card in cards}
+
+    request_body = json.loads(body)
+    query_state = request_body.setdefault("searchQueryState", {})
+    cards_by_zpid = {}
+    total_pages = 1
+    current_page = (query_state.get("pagination") or {}).get("currentPage", 1)
+
+    while True:
+        if payload is None:
+            payload = await page.evaluate(FETCH_SEARCH_JS, {"url": url, "method": method, "body": json.dumps(request_body)})
+            if payload is None:
+                print(f"⚠️ Search request for page {current_page} failed")
+                break
+        cards, total_pages = parse_search_results(payload)
+        before = len(cards_by_zpid)
+        for card in cards:
+            cards_by_zpid.setdefault(card["zpid"], card)
+        print(f"Search JSON page {current_page}/{total_pages}: {len(cards_by_zpid)} unique listings")
+
+        if len(cards_by_zpid) == before or current_page >= min(total_pages, max_pages):
+            break
+        current_page += 1
+        query_state["pagination"] = {"currentPage": current_page}
+        request_body["requestId"] = request_body.get("requestId", 1) + 1
+        payload = None
+        await delay()
+
+    return {card["url"]: card for card in cards_by_zpid.values()}
+
+
+async def scrape_zillow(capture_json=CAPTURE_SEARCH_JSON, tabs=DETAIL_TABS, max_listings=MAX_LISTINGS,
+                        store_path=STORE_PATH):
+    store = ListingStore(store_path)
     async with async_playwright() as p:
         # persistent context with Chrome
-        context, page = await get_context(p, proxy=None)
+        context, page, stats = await get_context(p, proxy=None)
+        captured = watch_search_json(page) if capture_json else None
         # go to Zillow search page
         await page.goto(ZILLOW_SEARCH_URL, timeout=120000, wait_until="domcontentloaded")
         await page.wait_for_selector("ul.photo-cards li article", timeout=120000)
 
-        # --- Infinite Scroll Logic (small steps + auto-stop) ---
-        seen_urls = set()
-        max_scrolls = 50       # absolute safety cap
-        scroll_step = 800      # px per scroll
-        pause = 1.5            # seconds to wait between steps
-        no_new_limit = 3       # stop if no new cards for N steps
-        no_new_count = 0
-
-        last_height = await page.evaluate("() => document.body.scrollHeight")
-
-        for i in range(max_scrolls):
-            # extract current property links
-            cards = await page.query_selector_all("ul.photo-cards li article a[data-test='property-card-link']")
-            current_count = len(seen_urls)
-
-            for a in cards:
-                href = await a.get_attribute("href")
-                if href:
-                    clean_url = urljoin("https://www.zillow.com", href.split("?")[0])
-                    seen_urls.add(clean_url)
-
-            # check if we found new URLs
-            if len(seen_urls) == current_count:
-                no_new_count += 1
-            else:
-                no_new_count = 0  # reset if new URLs found
-
-            print(f"Step {i+1}: collected {len(seen_urls)} unique listings")
-
-            if no_new_count >= no_new_limit:
-                print("🔚 No new listings after several steps, stopping scroll")
-                break
-
-            # scroll in small increments
-            await page.evaluate(f"window.scrollBy(0, {scroll_step})")
-            await asyncio.sleep(pause)
-
-            # check if page height stops growing
-            new_height = await page.evaluate("() => document.body.scrollHeight")
-            if new_height == last_height:
-                print("🔚 Reached bottom of page")
-                break
-            last_height = new_height
+        # --- Search-results JSON first, infinite scroll as the fallback ---
+        cards = await collect_search_cards(page, captured) if captured else {}
+        if cards:
+            seen_urls = set(cards)
+        else:
+            seen_urls = await harvest_card_urls(page)
 
         urls = list(seen_urls)
         print(f"✅ Total URLs collected: {len(urls)}")
+        print(f"Search page: {stats.summary()}")
 
-        # --- Extract listing details ---
-        listings = []
-        for link in urls[:50]:  # Limit to 50 for demo/testing
-            print(f"Scraping {link}")
-            details = await extract_listing_details(page, link)
+        await page.close()
+        if max_listings:
+            urls = urls[:max_listings]
+
+        # --- Only listings that are new or whose card price/status moved need their detail page ---
+        to_fetch = [link for link in urls if store.upsert_card(cards.get(link, {"url": link}))]
+        store.commit()
+        print(f"🔁 {len(urls) - len(to_fetch)} unchanged since the last run, fetching {len(to_fetch)} detail pages")
+
+        # --- Extract listing details on a pool of tabs ---
+        pacer = HostPacer(*PACING)
+
+        async def fetch_details(tab, link):
+            await pacer.wait(link)
+            tab_stats = TAB_STATS[tab]
+            tab_stats.reset()
+            details = await extract_listing_details(tab, link)
+            print(f"Scraped {link} ({tab_stats.summary()})")
+            return details
+
+        def save_details(link, details):
             if details:
-                listings.append(details)
-
-            await delay()  # simulate delay after page load
+                # card-level JSON fields fill whatever the detail page didn't give us
+                record = dict(cards.get(link, {}))
+                record.update({k: v for k, v in details.items() if v not in ("", None, [])})
+                store.save_details(record)
 
+        async with TabPool(context, size=tabs, setup=setup_tab) as pool:
+            all_details = await pool.map(fetch_details, to_fetch, on_result=save_details)
 
         await context.close()
 
-        df = pd.DataFrame(
-            listings,
-            columns=["url", "price", "address", "beds", "baths", "sqft", "facts", "specials", "agent"]
-        )
-        df.to_excel("zillow_listings.xlsx", index=False, engine="openpyxl")
+    # Unchanged listings come out of the store with the details from their last fetch
+    listings = store.seen_this_run()
+    store.close()
+
+    df = pd.DataFrame(listings, columns=["url"] + DETAIL_FIELDS)
+    df.to_excel("zillow_listings.xlsx", index=False, engine="openpyxl")
 
-        print(f"✅ Scraped {len(listings)} listings.")
+    print(f"✅ Scraped {sum(1 for d in all_details if d)} listings, {len(listings)} in this run's export.")
 
 
 if __name__ == "__main__":